@@ -0,0 +1,90 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import UserActivity
+
+_lock = threading.Lock()
+# user id -> datetime of the latest request not yet written
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def record(user_id, when):
+    """
+    Buffers the request time of a user, coalescing repeated
+    requests into one entry. Flushes the buffer to the database
+    when ACTIVITY_FLUSH_INTERVAL seconds passed since the last flush,
+    so at most that much activity is lost when a process dies.
+    """
+    if buffer(user_id, when):
+        flush()
+
+
+def buffer(user_id, when):
+    """
+    record() without the flush, for callers that can't
+    query the database on their thread, like async middleware.
+
+    Returns:
+    :return: True when the caller should flush()
+    """
+    global _last_flush
+    with _lock:
+        _pending[user_id] = when
+        now = time.monotonic()
+        due = now - _last_flush >= settings.ACTIVITY_FLUSH_INTERVAL
+        if due:
+            _last_flush = now
+    return due
+
+
+def pending_last_request(user_id):
+    """
+    Returns the buffered request time of a user, or None.
+    """
+    with _lock:
+        return _pending.get(user_id)
+
+
+def flush():
+    """
+    Writes the buffered request times with one bulk UPDATE
+    of existing rows and one bulk INSERT of new ones.
+    Greatest() keeps a newer time written by another process.
+
+    Returns:
+    :return: number of users written
+    """
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return 0
+
+    existing = set(UserActivity.objects.filter(
+        user_id__in=pending).values_list("user_id", flat=True))
+    UserActivity.objects.bulk_update(
+        [
+            UserActivity(
+                user_id=user_id,
+                last_request=Greatest(F("last_request"), Value(when)),
+            )
+            for user_id, when in pending.items()
+            if user_id in existing
+        ],
+        ["last_request"],
+    )
+    # Users deleted meanwhile are skipped
+    new_ids = User.objects.filter(
+        id__in=pending.keys() - existing).values_list("id", flat=True)
+    UserActivity.objects.bulk_create(
+        [UserActivity(user_id=user_id, last_request=pending[user_id])
+         for user_id in new_ids],
+        ignore_conflicts=True,
+    )
+    return len(pending)
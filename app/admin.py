@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import Post, Like
+from .models import (
+    Post, Like, LikeEvent, LikeStat, PostLikeStat, Follow, Job)
 
 # Register your models here.
 
 admin.site.register(Post)
 admin.site.register(Like)
+admin.site.register(LikeEvent)
+admin.site.register(LikeStat)
+admin.site.register(PostLikeStat)
+admin.site.register(Follow)
+admin.site.register(Job)
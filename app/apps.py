@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     name = "app"
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from . import database
+
+        connection_created.connect(database.configure_sqlite)
+        request_started.connect(database.check_connections)
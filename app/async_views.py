@@ -0,0 +1,126 @@
+"""
+Async versions of the read-heavy routes, for ASGI deployments
+(social_net.asgi), mounted under async/ in app/urls.py.
+
+They answer exactly like their app.views counterparts. DRF has
+no async views, so JWT authentication and JSON rendering are done
+here directly on the event loop, and all database and cache work
+is awaited on the bounded thread pool of app.asyncdb.
+"""
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, NotAuthenticated, ValidationError)
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import (
+    JWTTokenUserAuthentication)
+
+from .asyncdb import run_in_pool
+from .conditional import set_validators
+from .pagination import KeysetPagination
+from .renderers import TimedJSONRenderer
+from .views import _analytics, _fetch_post, _post_page, _user_activity
+
+_authentication = JWTTokenUserAuthentication()
+_renderer = TimedJSONRenderer()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(data), status=status,
+                        content_type="application/json")
+
+
+def authenticated(view):
+    """
+    Decorator of async views requiring a valid JWT access token,
+    like IsAuthenticated does for app.views. Sets request.user,
+    token checks need no query (see app.authentication).
+    """
+
+    async def wrapped(request, *args, **kwargs):
+        try:
+            result = _authentication.authenticate(request)
+            if result is None:
+                raise NotAuthenticated()
+        except APIException as error:
+            response = json_response({"detail": error.detail},
+                                     status=error.status_code)
+            header = _authentication.authenticate_header(request)
+            response["WWW-Authenticate"] = header
+            return response
+        request.user = result[0]
+        try:
+            return await view(request, *args, **kwargs)
+        except ValidationError as error:
+            # Bad query params, answered like DRF views do
+            return json_response(error.detail,
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+    wrapped.__name__ = view.__name__
+    wrapped.__doc__ = view.__doc__
+    return wrapped
+
+
+def _method_not_allowed():
+    return json_response({"detail": "Method not allowed."},
+                         status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@authenticated
+async def post_collection(request):
+    """
+    Async GET of app.views.post_collection.
+    Example url: /api/async/post/?page_size=20&cursor=MjAyMS0wMi0xNVQx...
+    """
+    if request.method != "GET":
+        return _method_not_allowed()
+    # DRF Request only for the query_params of KeysetPagination
+    paginator = KeysetPagination(Request(request))
+    response, data, validators = await run_in_pool(
+        _post_page, request, paginator)
+    if response is not None:
+        return response
+    response = paginator.add_link_header(json_response(data))
+    return set_validators(response, *validators)
+
+
+@authenticated
+async def post_element(request, id):
+    """
+    Async GET of app.views.post_element.
+    Example url: /api/async/post/3
+    """
+    if request.method != "GET":
+        return _method_not_allowed()
+    response, payload, cache_status = await run_in_pool(
+        _fetch_post, request, id)
+    if response is None:
+        response = json_response(payload["data"])
+        set_validators(response, payload["etag"], payload["last_modified"])
+    response["X-Cache"] = cache_status
+    return response
+
+
+@authenticated
+async def analytics(request):
+    """
+    Async version of app.views.analytics.
+    Example url: /api/async/analytics/?date_from=2020-02-02&date_to=2020-02-15
+    """
+    if request.method != "GET":
+        return _method_not_allowed()
+    data, status_code = await run_in_pool(_analytics, request.GET)
+    return json_response(data, status=status_code)
+
+
+@authenticated
+async def user_activity(request):
+    """
+    Async version of app.views.user_activity.
+    """
+    if request.method != "GET":
+        return _method_not_allowed()
+    data = await run_in_pool(_user_activity, request.user.id)
+    if data is None:
+        return HttpResponse(status=404)
+    return json_response(data)
@@ -0,0 +1,63 @@
+"""
+Runs blocking database and cache work of async views and middleware.
+
+Django 3.1 has no async ORM, and sync_to_async() either serializes
+calls on one thread (thread_sensitive=True) or uses the unbounded
+default executor of the loop. run_in_pool() uses a dedicated pool
+of ASYNC_DB_THREADS threads instead, so a worker process holds
+as many database connections as it has threads, however many
+slow clients are waiting on the event loop.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import database, metrics
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_THREADS,
+                thread_name_prefix="asyncdb",
+            )
+        return _executor
+
+
+def _call(func, args, kwargs):
+    # Pool threads keep their connections between calls, this
+    # drops the ones past CONN_MAX_AGE or broken, like the
+    # request_started / request_finished signals do for sync views
+    close_old_connections()
+    database.check_connections()
+    timing = metrics.current_timing.get()
+    with contextlib.ExitStack() as stack:
+        if timing is not None:
+            for wrapper in metrics.wrap_connections(timing):
+                stack.enter_context(wrapper)
+        return func(*args, **kwargs)
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """
+    Awaits func(*args, **kwargs) run on the database thread pool,
+    in a copy of the current context, so its queries are counted
+    in the RequestTiming of the request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(context.run, _call, func, args, kwargs),
+    )
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+User = get_user_model()
+
+
+class LazyTokenUser(TokenUser):
+    """
+    Stateless request.user for JWTTokenUserAuthentication,
+    set as SIMPLE_JWT["TOKEN_USER_CLASS"].
+
+    id and pk come straight from the access token claims,
+    so views that only need the id cost no query.
+    Any other User attribute (username, email, last_login...)
+    loads the auth.User row on first access, once per request.
+
+    As with any stateless token, a deactivated user keeps access
+    until the token expires (ACCESS_TOKEN_LIFETIME). A deleted one
+    is answered 401 as soon as its row is needed, see ensure_user_exists().
+    """
+
+    @cached_property
+    def user(self):
+        """
+        The full auth.User, loaded on first access.
+
+        Raises:
+        AuthenticationFailed: when the user was deleted
+        after the token was issued
+        """
+        try:
+            return User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            raise user_not_found()
+
+    @cached_property
+    def username(self):
+        return self.token.get("username") or self.user.username
+
+    @cached_property
+    def is_staff(self):
+        return self.user.is_staff
+
+    @cached_property
+    def is_superuser(self):
+        return self.user.is_superuser
+
+    def has_perm(self, perm, obj=None):
+        return self.user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.user.has_module_perms(module)
+
+    def __getattr__(self, name):
+        # Only reached for attributes TokenUser doesn't define
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def user_not_found():
+    return AuthenticationFailed("User not found", code="user_not_found")
+
+
+def ensure_user_exists(user_id):
+    """
+    For writes that only reference request.user.id and failed on
+    the foreign key: tells a token of a deleted user from a bug.
+
+    Raises:
+    AuthenticationFailed: when the user of user_id was deleted
+    """
+    if not User.objects.filter(pk=user_id).exists():
+        raise user_not_found()
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Bump when the cached payload shape changes
+POST_KEY_VERSION = 3
+# Seconds a recompute lock is held at most
+LOCK_TIMEOUT = 5
+# Polls of a waiting reader while another one recomputes
+LOCK_WAIT_INTERVAL = 0.01
+LOCK_WAIT_RETRIES = 50
+# Cached in place of the payload of a post that doesn't exist,
+# for MISSING_TIMEOUT seconds. Creating the post drops it sooner
+MISSING = "missing"
+MISSING_TIMEOUT = 5
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """
+    Returns hit and miss counters of this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def post_key(id):
+    return f"post:v{POST_KEY_VERSION}:{id}"
+
+
+def peek_post_payload(id):
+    """
+    Returns the cached payload of post 'id', MISSING when it
+    is known not to exist, or None, counting the lookup
+    as a hit or a miss.
+    """
+    payload = cache.get(post_key(id))
+    _count("hits" if payload is not None else "misses")
+    return payload
+
+
+def load_post_payload(id, loader):
+    """
+    Fills the cache entry of post 'id' after a miss.
+    Only the caller that wins the per-key lock calls loader(),
+    others wait for it to fill the cache, so a popular post
+    expiring doesn't stampede the database.
+
+    Args:
+    :param id: id of post object
+    :param loader: callable returning the payload, or None
+    when the post doesn't exist (cached as MISSING)
+
+    Returns:
+    :return: payload or None
+    """
+    key = post_key(id)
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            payload = loader()
+            if payload is None:
+                cache.set(key, MISSING, MISSING_TIMEOUT)
+            else:
+                cache.set(key, payload, settings.POST_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return payload
+
+    for _ in range(LOCK_WAIT_RETRIES):
+        time.sleep(LOCK_WAIT_INTERVAL)
+        payload = cache.get(key)
+        if payload is not None:
+            return None if payload == MISSING else payload
+    # The recompute is taking too long, don't keep the client waiting
+    return loader()
+
+
+def invalidate_post(id):
+    """
+    Drops the cached post 'id' now and once more
+    after the surrounding transaction commits, so a reader
+    racing the write can't keep the old payload cached.
+    """
+    key = post_key(id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_posts(ids):
+    """
+    invalidate_post() for many posts, with one cache round trip
+    now and one after commit.
+    """
+    keys = [post_key(id) for id in ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _month_key(year, month):
+    return f"analytics:month:{year}-{month:02d}"
+
+
+def get_analytics(params, months, loader):
+    """
+    Read-through lookup of analytics results. Entries are keyed
+    on the query params and on a version of every month the
+    query window covers, so a like only invalidates the results
+    of the windows it falls into.
+
+    Args:
+    :param params: string identifying the query, without spaces
+    :param months: (year, month) pairs covered by the query
+    :param loader: callable computing the result
+
+    Returns:
+    :return: tuple of (result, hit)
+    """
+    version_keys = [_month_key(year, month) for year, month in months]
+    # Read before loading, so a bump racing loader() only
+    # makes the entry stored below unreachable
+    versions = cache.get_many(version_keys)
+    # Hashed, a window of years would outgrow memcached's 250 chars
+    digest = hashlib.md5(".".join(
+        str(versions.get(k, 0)) for k in version_keys).encode()).hexdigest()
+    key = f"analytics:{params}:{digest}"
+    result = cache.get(key)
+    if result is not None:
+        return result, True
+    result = loader()
+    cache.set(key, result, settings.ANALYTICS_CACHE_TIMEOUT)
+    return result, False
+
+
+def invalidate_analytics(periods):
+    """
+    Bumps the versions of the months of 'periods', aware
+    datetimes, after the surrounding transaction commits.
+    """
+    months = {(local.year, local.month)
+              for local in map(timezone.localtime, periods)}
+
+    def bump():
+        for year, month in months:
+            key = _month_key(year, month)
+            # Versions never expire, only results do
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Evicted in between
+                cache.set(key, 1, None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,76 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def has_conditional_headers(request):
+    """
+    Whether the client sent validators worth checking
+    before doing the full query and serialization.
+    """
+    return ("HTTP_IF_NONE_MATCH" in request.META
+            or "HTTP_IF_MODIFIED_SINCE" in request.META)
+
+
+def post_validators(id, updated_at):
+    """
+    Returns (etag, last_modified) of a single post.
+    updated_at changes on every write of the post,
+    including like toggles, so the strong ETag follows it.
+    last_modified is a unix timestamp in whole seconds.
+    """
+    etag = quote_etag(f"post-{id}-{updated_at.timestamp():.6f}")
+    return etag, int(updated_at.timestamp())
+
+
+def page_validators(rows, has_next):
+    """
+    Returns (etag, None) of a page of posts from its
+    (id, updated_at) pairs. Adding, removing or changing any
+    post of the page changes the ETag. Pages have no
+    last_modified: the latest updated_at of the rows misses
+    deleted posts and posts shifting into the page, so
+    If-Modified-Since would answer 304 to a changed page.
+    """
+    digest = hashlib.md5(str(has_next).encode())
+    for id, updated_at in rows:
+        digest.update(f"|{id}-{updated_at.timestamp():.6f}".encode())
+    return quote_etag(f"posts-{digest.hexdigest()}"), None
+
+
+def user_validators(validators, user_id):
+    """
+    Returns (etag, last_modified) of a representation
+    personalized for user_id, like liked_by_me, so the copy
+    of one user never validates the request of another.
+    """
+    etag, last_modified = validators
+    return quote_etag(etag.strip('"') + f"-u{user_id}"), last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Returns a 304 response when the request validators
+    match, else None and the view goes on with the full response.
+    """
+    headers = HttpResponse()
+    set_validators(headers, etag, last_modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=headers)
+    if response is headers:
+        return None
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Sets the validators of a post representation. Posts carry
+    liked_by_me, so shared caches must key them on the user too.
+    """
+    patch_vary_headers(response, ["Authorization"])
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,45 @@
+"""
+Connection level tuning, wired up in AppConfig.ready():
+SQLite pragmas on every new connection and health checks
+of persistent connections (CONN_MAX_AGE) on every request.
+"""
+from django.db import connections
+
+# Applied to every new SQLite connection. WAL lets readers run
+# alongside the single writer, NORMAL sync is durable in WAL mode
+# except for the last transactions on power loss (not on crashes).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    # Negative is KiB: 64 MiB page cache per connection
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "foreign_keys": "ON",
+}
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver applying SQLITE_PRAGMAS.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def check_connections(**kwargs):
+    """
+    request_started receiver closing persistent connections that
+    no longer work (database restarted, idle timeout of a pooler...),
+    for databases with CONN_HEALTH_CHECKS, so the request reconnects
+    instead of failing on its first query. Django 3.1 only drops
+    connections after an error, one failed request too late.
+    """
+    for connection in connections.all():
+        if (connection.connection is not None
+                and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from app import tasks
+from app.cache import invalidate_analytics
+from app.models import (
+    Job, Like, LikeEvent, LikeStat, PostLikeStat, create_like_stats)
+
+
+def next_period(period, granularity):
+    """
+    Returns the start of the period following 'period'.
+    """
+    local = timezone.localtime(period).replace(tzinfo=None)
+    if granularity == LikeStat.HOUR:
+        local += timedelta(hours=1)
+    elif granularity == LikeStat.DAY:
+        local += timedelta(days=1)
+    elif granularity == LikeStat.WEEK:
+        local += timedelta(days=7)
+    else:
+        local = (local + timedelta(days=32)).replace(day=1)
+    return LikeStat.period_start(timezone.make_aware(local), granularity)
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the LikeStat and PostLikeStat rollups from Like rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date-from", help="First day, Y-m-d")
+        parser.add_argument("--date-to", help="Last day, Y-m-d")
+        parser.add_argument(
+            "--from-events", action="store_true",
+            help="Replay the LikeEvent log instead of reading Like rows")
+
+    def handle(self, *args, **options):
+        """
+        Recounts liked Like rows, or with --from-events the likes
+        left by replaying the LikeEvent log, by period of every
+        granularity within the optional --date-from/--date-to range,
+        widened to whole periods, and replaces the matching rollup
+        rows in one transaction. Pending bump_like_stats jobs are
+        applied in that transaction, so no like is counted twice.
+
+        Raises:
+        CommandError: when dates are not in format Y-m-d
+        """
+        try:
+            date_from = options["date_from"] and date.fromisoformat(
+                options["date_from"])
+            date_to = options["date_to"] and date.fromisoformat(
+                options["date_to"])
+        except ValueError as error:
+            raise CommandError(f"Dates must be in format Y-m-d: {error}")
+
+        ranges = {}
+        for granularity, _ in LikeStat.GRANULARITIES:
+            start = date_from and LikeStat.period_start(date_from, granularity)
+            end = date_to and next_period(
+                LikeStat.period_start(date_to, granularity), granularity)
+            ranges[granularity] = (start, end)
+
+        def in_range(period, granularity):
+            start, end = ranges[granularity]
+            return ((start is None or period >= start)
+                    and (end is None or period < end))
+
+        since = date_from and min(start for start, _ in ranges.values())
+        until = date_to and max(end for _, end in ranges.values())
+
+        def read_likes():
+            if options["from_events"]:
+                return (
+                    (like_date, post_id) for (_, post_id), like_date
+                    in LikeEvent.current_likes(since=since or None).items()
+                    if not until or like_date < until
+                )
+            likes = Like.objects.filter(liked=True)
+            if since:
+                likes = likes.filter(date__gte=since)
+            if until:
+                likes = likes.filter(date__lt=until)
+            return likes.values_list("date", "post_id").iterator()
+
+        # Periods whose cached analytics results become stale
+        periods = set()
+        with transaction.atomic():
+            # Every like counted below may still have its bump_like_stats
+            # job pending, Like.toggle() queues it in the same transaction.
+            # Those jobs are applied now, before their periods are rebuilt,
+            # instead of on top of them. Unlocking them takes the write
+            # lock first, so no toggle lands meanwhile, and a worker
+            # already running one rolls it back (see tasks.run()).
+            jobs = Job.objects.filter(name=tasks.bump_like_stats.task_name)
+            jobs.update(locked_until=None)
+            for args in jobs.values_list("args", flat=True):
+                tasks.bump_like_stats(*args)
+            jobs.delete()
+            for model in (LikeStat, PostLikeStat):
+                for granularity, (start, end) in ranges.items():
+                    stats = model.objects.filter(granularity=granularity)
+                    if start:
+                        stats = stats.filter(period__gte=start)
+                    if end:
+                        stats = stats.filter(period__lt=end)
+                    if model is LikeStat:
+                        periods.update(stats.values_list("period", flat=True))
+                    stats.delete()
+            totals, post_totals = create_like_stats(read_likes(), in_range)
+            periods.update(period for _, period in totals)
+            invalidate_analytics(periods)
+        self.stdout.write(
+            f"Rebuilt {len(totals)} like stats "
+            f"and {len(post_totals)} post like stats.")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import LikeEvent
+
+
+class Command(BaseCommand):
+    help = "Compacts the LikeEvent log older than the retention."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-days", type=int,
+            default=settings.LIKE_EVENT_RETENTION_DAYS,
+            help="Days of full history to keep")
+
+    def handle(self, *args, **options):
+        """
+        Deletes events older than --keep-days days, except
+        the latest like of each (user, post), see LikeEvent.compact().
+        Replays of the log still give the current likes,
+        history within the retention stays complete.
+        Meant to run daily, e.g. from cron.
+        """
+        before = timezone.now() - timedelta(days=options["keep_days"])
+        deleted = LikeEvent.compact(before)
+        self.stdout.write(
+            f"Deleted {deleted} like events older than {before:%Y-%m-%d}.")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of posts from scratch."
+
+    def handle(self, *args, **options):
+        """
+        Only needed after writes that skip the Post signals,
+        like raw SQL or QuerySet.update() of title or post.
+        """
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(f"Rebuilt {type(backend).__name__} index")
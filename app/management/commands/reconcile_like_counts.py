@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from app.models import Like, Post
+
+
+class Command(BaseCommand):
+    help = "Repairs drift of Post.like_count against liked Like rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """
+        Walks posts in id order, batch_size posts at a time.
+        Every batch is recounted with one grouped query, and only
+        drifted posts are rewritten, with one UPDATE that recounts
+        in SQL, so toggles committed meanwhile are not overwritten.
+        """
+        batch_size = options["batch_size"]
+        liked = (
+            Like.objects.filter(post=OuterRef("pk"), liked=True)
+            .order_by()
+            .values("post")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        last_id = 0
+        repaired = 0
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "like_count")[:batch_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1][0]
+            counts = dict(
+                Like.objects.filter(
+                    liked=True, post_id__in=[id for id, _ in posts])
+                .order_by()
+                .values_list("post_id")
+                .annotate(total=Count("id"))
+            )
+            drifted = [id for id, like_count in posts
+                       if like_count != counts.get(id, 0)]
+            if drifted:
+                repaired += Post.objects.filter(id__in=drifted).update(
+                    like_count=Coalesce(Subquery(liked), 0))
+        self.stdout.write(f"Repaired like_count of {repaired} posts.")
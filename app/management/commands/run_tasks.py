@@ -0,0 +1,57 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app import tasks
+
+
+class Command(BaseCommand):
+    help = "Runs queued background tasks, see app.tasks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=1,
+            help="Worker threads, each with its own connection")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Run the due jobs and exit instead of polling")
+
+    def handle(self, *args, **options):
+        """
+        Runs jobs as they come due, polling every TASK_POLL_INTERVAL
+        seconds when idle, until interrupted. Any number of these
+        may run side by side, jobs are claimed with a lock
+        (see tasks.claim()), so a job runs on one worker at a time.
+        """
+        if options["once"]:
+            succeeded, failed = tasks.run_pending()
+            self.stdout.write(f"Ran {succeeded} jobs, {failed} failed.")
+            return
+
+        stop = threading.Event()
+        workers = [threading.Thread(target=self.work, args=(stop,))
+                   for _ in range(options["threads"])]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running jobs.")
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def work(self, stop):
+        try:
+            while not stop.is_set():
+                job = tasks.claim()
+                if job is None:
+                    stop.wait(settings.TASK_POLL_INTERVAL)
+                else:
+                    tasks.run(job)
+        finally:
+            connection.close()
@@ -0,0 +1,194 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from django.db import connections
+
+from . import cache
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# RequestTiming of the request being handled, if any
+current_timing = contextvars.ContextVar("current_timing", default=None)
+
+
+class Histogram:
+    """
+    Cumulative histogram per route, exposed in
+    Prometheus text format by render().
+    """
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, route, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(route)
+            if series is None:
+                series = self._series[route] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                }
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {route: (list(data["counts"]), data["sum"])
+                      for route, data in self._series.items()}
+        for route, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            bounds = [*map(str, self.buckets), "+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{route="{route}",'
+                             f'le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{route="{route}"}} {total}')
+            lines.append(f'{self.name}_count{{route="{route}"}} {cumulative}')
+        return lines
+
+
+request_duration = Histogram(
+    "social_net_request_duration_seconds",
+    "Overall latency of requests by route.", LATENCY_BUCKETS)
+db_duration = Histogram(
+    "social_net_db_duration_seconds",
+    "Time spent in SQL queries per request by route.", LATENCY_BUCKETS)
+db_queries = Histogram(
+    "social_net_db_queries",
+    "Number of SQL queries per request by route.", QUERY_COUNT_BUCKETS)
+serialization_duration = Histogram(
+    "social_net_serialization_duration_seconds",
+    "Time spent rendering response bodies per request by route.",
+    LATENCY_BUCKETS)
+
+
+class DecayingAverage:
+    """
+    Exponentially weighted moving average that also decays
+    towards zero with time, so it recovers while nothing is
+    observed, e.g. while writes are being shed.
+    """
+
+    def __init__(self, weight=0.2, half_life=5.0):
+        self.weight = weight
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def _decay(self, now):
+        elapsed = now - self._updated
+        self._value *= 0.5 ** (elapsed / self.half_life)
+        self._updated = now
+
+    def observe(self, value):
+        with self._lock:
+            self._decay(time.monotonic())
+            self._value += self.weight * (value - self._value)
+
+    def value(self):
+        with self._lock:
+            self._decay(time.monotonic())
+            return self._value
+
+
+# Duration of write statements, which includes waiting for the
+# database write lock, see app.throttling.LoadShedThrottle
+db_write_wait = DecayingAverage()
+
+_WRITES = ("INSERT", "UPDATE", "DELETE")
+
+
+class RequestTiming:
+    """
+    Accumulates query count, DB time and serialization
+    time of one request. Installed as execute wrapper on
+    every database connection by MetricsMiddleware.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_time += elapsed
+            self.queries += 1
+            if sql.lstrip()[:6].upper() in _WRITES:
+                db_write_wait.observe(elapsed)
+
+    def server_timing(self, total):
+        """
+        Returns the Server-Timing header value, durations in ms.
+        """
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} '
+                f'queries", ser;dur={self.serialization_time * 1000:.2f}, '
+                f"total;dur={total * 1000:.2f}")
+
+    def record(self, route, total):
+        request_duration.observe(route, total)
+        db_duration.observe(route, self.db_time)
+        db_queries.observe(route, self.queries)
+        serialization_duration.observe(route, self.serialization_time)
+
+
+class timed_serialization:
+    """
+    Context manager adding the time of its block to the
+    serialization time of the current request, if any.
+    """
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.serialization_time += time.perf_counter() - self.started
+
+
+def wrap_connections(timing):
+    """
+    Returns the execute_wrapper() context managers
+    of all configured connections for timing.
+    """
+    return [connection.execute_wrapper(timing)
+            for connection in connections.all()]
+
+
+def render():
+    """
+    Returns all metrics in Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in (request_duration, db_duration, db_queries,
+                      serialization_duration):
+        lines += histogram.render()
+    metric = "social_net_db_write_wait_seconds"
+    lines += [f"# HELP {metric} Moving average of write statement "
+              "durations, lock waits included.",
+              f"# TYPE {metric} gauge",
+              f"{metric} {db_write_wait.value()}"]
+    cache_stats = cache.stats()
+    for name in ("hits", "misses"):
+        metric = f"social_net_post_cache_{name}_total"
+        lines += [f"# HELP {metric} Post read-through cache {name}.",
+                  f"# TYPE {metric} counter",
+                  f"{metric} {cache_stats[name]}"]
+    return "\n".join(lines) + "\n"
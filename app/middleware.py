@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import time
+
+from django.utils import timezone
+
+from . import activity, metrics, routers
+from .asyncdb import run_in_pool
+
+
+class AsyncCapableMiddleware:
+    """
+    Base of middleware running both in sync (WSGI) and async
+    (ASGI) chains, so async views aren't forced onto a thread.
+    Subclasses implement __call__ for the sync chain and
+    __acall__ for the async one.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django's handler that __call__ returns a coroutine
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Records per route (url name from app/urls.py) the query count,
+    DB time, serialization time and overall latency of every request,
+    aggregated as histograms served by the metrics view, and sends
+    them back in the Server-Timing header.
+    Bodies streamed after the view returns are not included.
+    In the async chain queries are counted by app.asyncdb.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing = metrics.RequestTiming()
+        token = metrics.current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for wrapper in metrics.wrap_connections(timing):
+                    stack.enter_context(wrapper)
+                response = self.get_response(request)
+        finally:
+            metrics.current_timing.reset(token)
+        return self.finish(request, response, timing, started)
+
+    async def __acall__(self, request):
+        timing = metrics.RequestTiming()
+        token = metrics.current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_timing.reset(token)
+        return self.finish(request, response, timing, started)
+
+    def finish(self, request, response, timing, started):
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else "unmatched"
+        timing.record(route, total)
+        response["Server-Timing"] = timing.server_timing(total)
+        return response
+
+
+class ActivityMiddleware(AsyncCapableMiddleware):
+    """
+    Records the time of every authenticated request
+    in the write-behind buffer of app.activity.
+    Runs after the view, when DRF has authenticated request.user.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self.user_id(request)
+        if user_id is not None:
+            activity.record(user_id, timezone.now())
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self.user_id(request)
+        if user_id is not None and activity.buffer(user_id, timezone.now()):
+            await run_in_pool(activity.flush)
+        return response
+
+    @staticmethod
+    def user_id(request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.id
+        return None
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Lets app.routers.ReplicaRouter send the reads of GET and HEAD
+    views to the replica. Installed last, so the activity flush
+    and everything else outside the view read the primary.
+    """
+
+    safe_methods = ("GET", "HEAD")
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = routers.use_replica.set(request.method in self.safe_methods)
+        try:
+            return self.get_response(request)
+        finally:
+            routers.use_replica.reset(token)
+
+    async def __acall__(self, request):
+        token = routers.use_replica.set(request.method in self.safe_methods)
+        try:
+            return await self.get_response(request)
+        finally:
+            routers.use_replica.reset(token)
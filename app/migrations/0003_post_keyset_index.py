@@ -0,0 +1,28 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0002_auto_20210215_1003"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["-date_published", "-id"]},
+        ),
+        migrations.AlterField(
+            model_name="like",
+            name="liked",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-date_published", "-id"], name="post_published_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0003_post_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyLikeStat",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("total_likes", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["day"],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    """
+    Keeps only the latest Like of every (user, post) pair,
+    so the unique constraint can be added.
+    Rerun backfill_like_stats afterwards if any were removed.
+    """
+    Like = apps.get_model("app", "Like")
+    latest_ids = (
+        Like.objects.values("user", "post")
+        .annotate(latest_id=Max("id"))
+        .values_list("latest_id", flat=True)
+    )
+    Like.objects.exclude(id__in=list(latest_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0004_dailylikestat"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_user_post_like"
+            ),
+        ),
+    ]
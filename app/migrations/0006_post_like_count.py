@@ -0,0 +1,34 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_likes(apps, schema_editor):
+    Post = apps.get_model("app", "Post")
+    Like = apps.get_model("app", "Like")
+    liked = (
+        Like.objects.filter(post=OuterRef("pk"), liked=True)
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Post.objects.update(like_count=Coalesce(Subquery(liked), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_unique_user_post_like"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_likes, migrations.RunPython.noop),
+    ]
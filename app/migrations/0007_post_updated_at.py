@@ -0,0 +1,29 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:12
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_date_published(apps, schema_editor):
+    Post = apps.get_model("app", "Post")
+    Post.objects.update(updated_at=F("date_published"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0006_post_like_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_date_published, migrations.RunPython.noop),
+    ]
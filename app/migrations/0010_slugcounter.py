@@ -0,0 +1,45 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:24
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def count_slugs(apps, schema_editor):
+    # Every existing slug is the first of its base. Longer slugs
+    # can't be a base anymore, and no base can collide with them.
+    Post = apps.get_model("app", "Post")
+    SlugCounter = apps.get_model("app", "SlugCounter")
+    slugs = (
+        Post.objects.annotate(length=Length("slug"))
+        .filter(length__lte=42)
+        .values_list("slug", flat=True)
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for slug in slugs:
+        batch.append(SlugCounter(base=slug, last=1))
+        if len(batch) >= 2000:
+            SlugCounter.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    SlugCounter.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_follow_timeline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlugCounter",
+            fields=[
+                (
+                    "base",
+                    models.CharField(max_length=42, primary_key=True, serialize=False),
+                ),
+                ("last", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # See app.search.SQLiteFTSBackend, other databases
+    # fall back to app.search.DatabaseSearchBackend
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE app_post_fts USING fts5("
+        "title, post, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO app_post_fts (app_post_fts, rank) "
+        "VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+    schema_editor.execute(
+        "INSERT INTO app_post_fts (rowid, title, post) "
+        "SELECT id, title, post FROM app_post"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE app_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0010_slugcounter"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
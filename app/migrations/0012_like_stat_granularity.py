@@ -0,0 +1,115 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_like_stats(apps, schema_editor):
+    # All granularities and the per post breakdown, counted from the
+    # Like rows with the code of `manage.py backfill_like_stats`
+    from app.models import create_like_stats
+
+    Like = apps.get_model("app", "Like")
+    create_like_stats(
+        Like.objects.filter(liked=True).values_list("date", "post_id").iterator(),
+        like_stat_model=apps.get_model("app", "LikeStat"),
+        post_like_stat_model=apps.get_model("app", "PostLikeStat"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0011_post_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LikeStat",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[
+                            ("h", "hour"),
+                            ("d", "day"),
+                            ("w", "week"),
+                            ("m", "month"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                ("period", models.DateTimeField()),
+                ("total_likes", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["granularity", "period"],
+            },
+        ),
+        migrations.CreateModel(
+            name="PostLikeStat",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[
+                            ("h", "hour"),
+                            ("d", "day"),
+                            ("w", "week"),
+                            ("m", "month"),
+                        ],
+                        max_length=1,
+                    ),
+                ),
+                ("period", models.DateTimeField()),
+                ("total_likes", models.IntegerField(default=0)),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="app.post"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="likestat",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "period"), name="unique_like_stat_period"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="postlikestat",
+            index=models.Index(
+                fields=["granularity", "period"], name="post_like_stat_period_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="postlikestat",
+            constraint=models.UniqueConstraint(
+                fields=("post", "granularity", "period"),
+                name="unique_post_like_stat_period",
+            ),
+        ),
+        migrations.RunPython(build_like_stats, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name="DailyLikeStat",
+        ),
+    ]
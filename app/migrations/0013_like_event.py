@@ -0,0 +1,77 @@
+# Generated by Django 3.1.6 on 2026-10-18 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_events(apps, schema_editor):
+    # One event per existing Like carries its current state into the log
+    Like = apps.get_model("app", "Like")
+    LikeEvent = apps.get_model("app", "LikeEvent")
+    batch = []
+    for like in Like.objects.order_by("date").iterator(chunk_size=2000):
+        batch.append(
+            LikeEvent(
+                user_id=like.user_id,
+                post_id=like.post_id,
+                liked=like.liked,
+                date=like.date,
+            )
+        )
+        if len(batch) >= 2000:
+            LikeEvent.objects.bulk_create(batch)
+            batch = []
+    LikeEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("app", "0012_like_stat_granularity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LikeEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("liked", models.BooleanField()),
+                ("date", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="app.post"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="likeevent",
+            index=models.Index(
+                fields=["user", "post", "id"], name="like_event_user_post_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="likeevent",
+            index=models.Index(fields=["date"], name="like_event_date_idx"),
+        ),
+        migrations.RunPython(seed_events, migrations.RunPython.noop),
+    ]
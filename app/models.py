@@ -1,9 +1,25 @@
-from datetime import datetime
-from django.db import models
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_save
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
 from django.utils.text import slugify
 
+from . import tasks
+from .cache import invalidate_analytics, invalidate_post, invalidate_posts
+
+# Latest posts of a followee copied into a new follower's timeline
+TIMELINE_BACKFILL = 100
+
+# Rows of a rollup updated per query by _add_totals()
+TOTALS_BATCH = 1000
+
+# Post.slug is 50 chars at most, the rest is left for a "--<n>" suffix
+SLUG_BASE_LENGTH = 42
+
 # Create your models here.
 
 
@@ -13,12 +29,73 @@ class Post(models.Model):
     post = models.TextField(null=False, blank=False)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
     date_published = models.DateTimeField(auto_now_add=True)
+    # Denormalized number of liked Likes, maintained by Like.toggle()
+    # and repaired by the reconcile_like_counts command
+    like_count = models.IntegerField(default=0)
+    # Moves on every write, like toggles included,
+    # backs the ETag and Last-Modified of post responses
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
     class Meta:
-        ordering = ["-date_published"]
+        ordering = ["-date_published", "-id"]
+        indexes = [
+            # Backs keyset pagination of post_collection, see app.pagination
+            models.Index(fields=["-date_published", "-id"],
+                         name="post_published_id_idx"),
+            # Latest post of an author, see user_activity
+            models.Index(fields=["author", "-date_published"],
+                         name="post_author_published_idx"),
+        ]
+
+    @staticmethod
+    def make_slug(username, title):
+        """
+            make_slug() method returns the base slug of a post,
+            SlugCounter.allocate() turns it into a unique one.
+        """
+        base = slugify(username + "-" + title)[:SLUG_BASE_LENGTH]
+        return base.rstrip("-") or "post"
+
+    @classmethod
+    def publish_many(cls, author_id, username, items):
+        """
+            publish_many() method creates posts of the author
+            from a list of {"title", "post"} dicts with one
+            bulk INSERT in one transaction, and queues their fan-out
+            to the followers' timelines and their search indexing.
+            bulk_create() skips the signals, so slugs and
+            the tasks are done here.
+
+            Returns:
+            :return: list of created posts, in the order of items
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            slugs = SlugCounter.allocate(
+                [cls.make_slug(username, item["title"]) for item in items])
+            posts = [
+                cls(author_id=author_id, title=item["title"],
+                    post=item["post"], slug=slug,
+                    date_published=now, updated_at=now)
+                for item, slug in zip(items, slugs)
+            ]
+            cls.objects.bulk_create(posts)
+            if posts and posts[0].pk is None:
+                # Backends that can't return the ids of a bulk INSERT
+                ids = dict(cls.objects.filter(
+                    slug__in=[post.slug for post in posts]
+                ).values_list("slug", "id"))
+                for post in posts:
+                    post.pk = ids[post.slug]
+            ids = [post.id for post in posts]
+            # Drops lookups of the new ids cached as missing
+            invalidate_posts(ids)
+            tasks.enqueue(tasks.fan_out, ids)
+            tasks.enqueue(tasks.sync_search, ids)
+        return posts
 
 
 class Like(models.Model):
@@ -30,20 +107,694 @@ class Like(models.Model):
     def __str__(self):
         return str(self.liked)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_user_post_like"),
+        ]
+        indexes = [
+            # Latest like of a user, see user_activity
+            models.Index(fields=["user", "-date"], name="like_user_date_idx"),
+        ]
+
     def like_unlike(self):
         """
             like_unlike() method switches
             'liked' Boolean field to opposite value.
+            'date' keeps the moment of the latest like.
         """
         self.liked = not self.liked
-        self.date = datetime.now()
+        if self.liked:
+            self.date = timezone.now()
         return self.liked
 
+    @classmethod
+    def toggle(cls, user_id, post_id):
+        """
+            toggle() method switches 'liked' of the user's Like
+            of the post with a single conditional UPDATE,
+            or inserts a liked Like if the user has none yet.
+            Runs in one transaction together with the
+            LikeEvent insert and the Post.like_count update,
+            so concurrent toggles can't lose updates
+            or create duplicate rows. The LikeStat rollups
+            are bumped by a task queued in that transaction,
+            so backfill_like_stats sees the job of every Like
+            it counts (see there).
+
+            The UPDATE goes first even when no row matches:
+            it takes the write lock up front, so the SELECT
+            and INSERT that follow never need a lock upgrade,
+            which SQLite would refuse under concurrency.
+
+            Raises:
+            Post.DoesNotExist: when target post is not found
+
+            Returns:
+            :return: tuple of (like, created)
+        """
+        now = timezone.now()
+        likes = cls.objects.filter(user_id=user_id, post_id=post_id)
+        posts = Post.objects.filter(id=post_id)
+        flip = {
+            "liked": Case(When(liked=True, then=Value(False)),
+                          default=Value(True),
+                          output_field=models.BooleanField()),
+            "date": Case(When(liked=False, then=Value(now)),
+                         default=F("date"),
+                         output_field=models.DateTimeField()),
+        }
+        with transaction.atomic():
+            updated = likes.update(**flip)
+            created = False
+            if not updated:
+                if not posts.exists():
+                    raise Post.DoesNotExist
+                try:
+                    with transaction.atomic():
+                        like = cls.objects.create(
+                            user_id=user_id, post_id=post_id, liked=True)
+                    created = True
+                except IntegrityError:
+                    # Lost a race with a concurrent first like
+                    likes.update(**flip)
+            if not created:
+                like = likes.get()
+            LikeEvent.objects.create(user_id=user_id, post_id=post_id,
+                                     liked=like.liked, date=now)
+            delta = 1 if like.liked else -1
+            posts.update(like_count=F("like_count") + delta, updated_at=now)
+            tasks.enqueue(tasks.bump_like_stats,
+                          [(like.date.isoformat(), post_id, delta)],
+                          with_writes=True)
+            invalidate_post(post_id)
+        return like, created
+
+    @classmethod
+    def toggle_many(cls, user_id, post_ids):
+        """
+            toggle_many() method is toggle() for many posts
+            of one user, in one transaction and a number of queries
+            independent of len(post_ids): one conditional UPDATE
+            flips the existing Likes, one bulk INSERT creates
+            the missing ones and one UPDATE moves the like_count
+            of all posts, and one task bumps the LikeStat rollups
+            of all changes at once.
+            post_ids must be distinct.
+
+            Returns:
+            :return: dict of post id to (like, created),
+            posts that don't exist are left out
+        """
+        now = timezone.now()
+        likes = cls.objects.filter(user_id=user_id, post_id__in=post_ids)
+        flip = {
+            "liked": Case(When(liked=True, then=Value(False)),
+                          default=Value(True),
+                          output_field=models.BooleanField()),
+            "date": Case(When(liked=False, then=Value(now)),
+                         default=F("date"),
+                         output_field=models.DateTimeField()),
+        }
+        with transaction.atomic():
+            # Takes the write lock first, see toggle()
+            likes.update(**flip)
+            existing = set(likes.values_list("post_id", flat=True))
+            missing = Post.objects.filter(
+                id__in=[id for id in post_ids if id not in existing]
+            ).values_list("id", flat=True)
+            created = set(missing)
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(
+                        [cls(user_id=user_id, post_id=post_id, liked=True,
+                             date=now) for post_id in created])
+            except IntegrityError:
+                # Lost a race with concurrent first likes, flip those
+                raced = likes.filter(post_id__in=created)
+                created -= set(raced.values_list("post_id", flat=True))
+                raced.update(**flip)
+                cls.objects.bulk_create(
+                    [cls(user_id=user_id, post_id=post_id, liked=True,
+                         date=now) for post_id in created])
+            result = {like.post_id: (like, like.post_id in created)
+                      for like in likes}
+            if not result:
+                return result
+
+            LikeEvent.objects.bulk_create(
+                [LikeEvent(user_id=user_id, post_id=post_id,
+                           liked=like.liked, date=now)
+                 for post_id, (like, _) in result.items()])
+            liked_ids = [id for id, (like, _) in result.items() if like.liked]
+            Post.objects.filter(id__in=result).update(
+                like_count=F("like_count") + Case(
+                    When(id__in=liked_ids, then=Value(1)),
+                    default=Value(-1),
+                    output_field=models.IntegerField()),
+                updated_at=now,
+            )
+            tasks.enqueue(tasks.bump_like_stats, [
+                (like.date.isoformat(), like.post_id, 1 if like.liked else -1)
+                for like, _ in result.values()], with_writes=True)
+            invalidate_posts(result)
+        return result
+
+
+class LikeEvent(models.Model):
+    """
+    Append-only log of like toggles, one row per toggle
+    with the resulting state. Like holds the compacted current
+    state of every (user, post), and the rollups can be replayed
+    from the log, see current_likes(). compact_like_events keeps
+    only the latest event of each (user, post) past the retention.
+
+    Like.toggle() inserts the event next to its Like and like_count
+    updates rather than instead of them: the response needs the
+    resulting state and like_count is read on every post page.
+    The insert rides the same transaction and write lock, about
+    5% of toggles per second in benchmarks.like_toggle.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    liked = models.BooleanField()
+    date = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} {self.post_id} {self.liked} {self.date}"
+
+    class Meta:
+        indexes = [
+            # Later events of the same (user, post), see compact()
+            models.Index(fields=["user", "post", "id"],
+                         name="like_event_user_post_idx"),
+            models.Index(fields=["date"], name="like_event_date_idx"),
+        ]
+
+    @classmethod
+    def current_likes(cls, since=None):
+        """
+            current_likes() method replays the log in order
+            and returns the (user_id, post_id) pairs liked
+            at the end of it, with the date of their like.
+            With 'since', only likes from then on are returned
+            and only events from then on are read.
+
+            Returns:
+            :return: dict of (user_id, post_id) to like date
+        """
+        events = cls.objects.order_by("id")
+        if since is not None:
+            events = events.filter(date__gte=since)
+        likes = {}
+        for user_id, post_id, liked, date in events.values_list(
+                "user_id", "post_id", "liked", "date").iterator():
+            if liked:
+                likes[user_id, post_id] = date
+            else:
+                likes.pop((user_id, post_id), None)
+        return likes
+
+    @classmethod
+    def compact(cls, before):
+        """
+            compact() method deletes the events older than
+            'before' that a later event of the same (user, post)
+            supersedes, then the remaining old unlikes, which leave
+            nothing to replay. current_likes() is unchanged.
+
+            Returns:
+            :return: number of deleted events
+        """
+        old = cls.objects.filter(date__lt=before)
+        superseded = old.filter(Exists(cls.objects.filter(
+            user_id=OuterRef("user_id"), post_id=OuterRef("post_id"),
+            id__gt=OuterRef("id"))))
+        with transaction.atomic():
+            deleted, _ = superseded.delete()
+            # Only the latest event of their (user, post) is left
+            unliked, _ = old.filter(liked=False).delete()
+        return deleted + unliked
+
+
+class LikeStat(models.Model):
+    """
+    Rollup of likes by hour, day, week (from Monday) and month,
+    in the current timezone. Kept in sync by the bump_like_stats task
+    of Like.toggle() and rebuilt by the backfill_like_stats command.
+    Counts Like rows with liked=True by the period of their date.
+    """
+
+    HOUR = "h"
+    DAY = "d"
+    WEEK = "w"
+    MONTH = "m"
+    GRANULARITIES = [
+        (HOUR, "hour"),
+        (DAY, "day"),
+        (WEEK, "week"),
+        (MONTH, "month"),
+    ]
+
+    granularity = models.CharField(max_length=1, choices=GRANULARITIES)
+    # Start of the period
+    period = models.DateTimeField()
+    total_likes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.granularity} {self.period}: {self.total_likes}"
+
+    class Meta:
+        ordering = ["granularity", "period"]
+        constraints = [
+            models.UniqueConstraint(fields=["granularity", "period"],
+                                    name="unique_like_stat_period"),
+        ]
+
+    @classmethod
+    def period_start(cls, date, granularity):
+        """
+            period_start() method returns the start of the
+            period of 'granularity' containing 'date', an aware
+            datetime in the current timezone. 'date' may also
+            be a date, standing for its midnight.
+        """
+        if isinstance(date, datetime.datetime):
+            local = timezone.localtime(date).replace(tzinfo=None)
+        else:
+            local = datetime.datetime.combine(date, datetime.time())
+        local = local.replace(minute=0, second=0, microsecond=0)
+        if granularity != cls.HOUR:
+            local = local.replace(hour=0)
+        if granularity == cls.WEEK:
+            local -= datetime.timedelta(days=local.weekday())
+        elif granularity == cls.MONTH:
+            local = local.replace(day=1)
+        return timezone.make_aware(local)
+
+    @classmethod
+    def totals(cls, changes, in_range=None):
+        """
+            totals() method sums the deltas of 'changes', an iterable
+            of (date, post_id, delta), by period of every granularity,
+            keeping only the periods for which in_range(period,
+            granularity) is true when given.
+
+            Returns:
+            :return: tuple of dicts, (granularity, period) to total
+            and (post_id, granularity, period) to total
+        """
+        totals, post_totals = {}, {}
+        for date, post_id, delta in changes:
+            for granularity, _ in cls.GRANULARITIES:
+                period = cls.period_start(date, granularity)
+                if in_range and not in_range(period, granularity):
+                    continue
+                key = (granularity, period)
+                totals[key] = totals.get(key, 0) + delta
+                key = (post_id, granularity, period)
+                post_totals[key] = post_totals.get(key, 0) + delta
+        return totals, post_totals
+
+    @classmethod
+    def bump(cls, changes):
+        """
+            bump() method adds the deltas of 'changes', a list of
+            (date, post_id, delta), to the periods of all
+            granularities, in LikeStat and in PostLikeStat.
+            Two queries per table whatever the size of changes:
+            insert the missing rows, then one conditional UPDATE.
+        """
+        totals, post_totals = cls.totals(changes)
+        _add_totals(cls, {
+            Q(granularity=granularity, period=period): delta
+            for (granularity, period), delta in totals.items() if delta
+        })
+        _add_totals(PostLikeStat, {
+            Q(post_id=post_id, granularity=granularity, period=period): delta
+            for (post_id, granularity, period), delta in post_totals.items()
+            if delta
+        })
+        # Cached results of windows covering any touched period
+        invalidate_analytics({period for _, period in totals})
+
+
+class PostLikeStat(models.Model):
+    """
+    LikeStat broken down by post, for the post, author
+    and top posts modes of the analytics route.
+    """
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=1,
+                                   choices=LikeStat.GRANULARITIES)
+    period = models.DateTimeField()
+    total_likes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return (f"{self.post_id} {self.granularity} {self.period}: "
+                f"{self.total_likes}")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "granularity", "period"],
+                name="unique_post_like_stat_period"),
+        ]
+        indexes = [
+            # Top posts of a window
+            models.Index(fields=["granularity", "period"],
+                         name="post_like_stat_period_idx"),
+        ]
+
+
+def create_like_stats(likes, in_range=None, like_stat_model=LikeStat,
+                      post_like_stat_model=PostLikeStat):
+    """
+    Inserts the LikeStat and PostLikeStat rows counting likes,
+    an iterable of (date, post_id) of liked Likes, for the periods
+    picked by in_range (see LikeStat.totals()), which must hold
+    no rows yet. Used by the backfill_like_stats command and by
+    migration 0012, which passes its historical models.
+
+    Returns:
+    :return: tuple of dicts, as returned by LikeStat.totals()
+    """
+    totals, post_totals = LikeStat.totals(
+        ((date, post_id, 1) for date, post_id in likes), in_range)
+    like_stat_model.objects.bulk_create(
+        (like_stat_model(granularity=granularity, period=period,
+                         total_likes=total_likes)
+         for (granularity, period), total_likes in totals.items()),
+        batch_size=1000,
+    )
+    post_like_stat_model.objects.bulk_create(
+        (post_like_stat_model(post_id=post_id, granularity=granularity,
+                              period=period, total_likes=total_likes)
+         for (post_id, granularity, period), total_likes
+         in post_totals.items()),
+        batch_size=1000,
+    )
+    return totals, post_totals
+
+
+def _add_totals(model, deltas):
+    """
+    Adds deltas, a dict of Q() matching one row to delta,
+    to total_likes of model rows, creating missing rows first.
+    The UPDATE narrows the rows with an IN list per field rather
+    than an OR of the keys, which SQLite caps at a depth of 1000,
+    and takes TOTALS_BATCH keys at a time.
+    """
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(q.children)) for q in deltas], ignore_conflicts=True)
+    deltas = list(deltas.items())
+    for start in range(0, len(deltas), TOTALS_BATCH):
+        batch = deltas[start:start + TOTALS_BATCH]
+        values = {}
+        for q, _ in batch:
+            for field, value in q.children:
+                values.setdefault(f"{field}__in", set()).add(value)
+        model.objects.filter(**values).update(
+            total_likes=F("total_likes") + Case(
+                *[When(q, then=Value(delta)) for q, delta in batch],
+                default=Value(0),
+                output_field=models.IntegerField(),
+            ))
+
+
+class SlugCounter(models.Model):
+    """
+    Number of Post slugs handed out per base slug,
+    so unique slugs are reserved without probing Post.
+    The first post of a base gets the base itself,
+    the n-th one "<base>--<n>". slugify() never emits "--",
+    so suffixed slugs can't collide with a base.
+    """
+
+    base = models.CharField(max_length=SLUG_BASE_LENGTH, primary_key=True)
+    last = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.base}: {self.last}"
+
+    @classmethod
+    def allocate(cls, bases):
+        """
+            allocate() method reserves one unique slug for each
+            of bases, duplicates included, in three queries:
+            insert the missing counters, bump all of them
+            with one conditional UPDATE and read them back.
+            Should run in the same transaction as the INSERT
+            of the posts, a rolled back slug is simply skipped.
+
+            Returns:
+            :return: list of slugs, in the order of bases
+        """
+        if not bases:
+            return []
+        wanted = {}
+        for base in bases:
+            wanted[base] = wanted.get(base, 0) + 1
+        counters = cls.objects.filter(base__in=wanted)
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(base=base) for base in wanted], ignore_conflicts=True)
+            counters.update(last=F("last") + Case(
+                *[When(base=base, then=Value(count))
+                  for base, count in wanted.items()],
+                output_field=models.PositiveIntegerField(),
+            ))
+            last = dict(counters.values_list("base", "last"))
+        slugs = []
+        for base in bases:
+            number = last[base] - wanted[base] + 1
+            wanted[base] -= 1
+            slugs.append(base if number == 1 else f"{base}--{number}")
+        return slugs
+
+
+class UserActivity(models.Model):
+    """
+    Time of the latest authenticated request of a user.
+    Written in bulk by app.activity, never once per request.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="activity")
+    last_request = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_request}"
+
+
+class Follow(models.Model):
+    """
+    'follower' follows 'followee'.
+    'fanout' tells whether posts of followee are pushed
+    into follower's timeline on write (True) or merged
+    in on read, once followee has more than
+    TIMELINE_FANOUT_LIMIT followers (False).
+    """
+
+    follower = models.ForeignKey(User, on_delete=models.CASCADE,
+                                 related_name="following")
+    followee = models.ForeignKey(User, on_delete=models.CASCADE,
+                                 related_name="followers")
+    fanout = models.BooleanField(default=True)
+    date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "followee"],
+                                    name="unique_follower_followee"),
+        ]
+        indexes = [
+            # Pull-based followees of a follower, see app.timeline
+            models.Index(fields=["follower", "fanout"],
+                         name="follow_follower_fanout_idx"),
+            models.Index(fields=["followee", "fanout"],
+                         name="follow_followee_fanout_idx"),
+        ]
+
+    @classmethod
+    def follow(cls, follower_id, followee_id):
+        """
+            follow() method makes follower follow followee
+            and backfills the follower's timeline with the
+            latest TIMELINE_BACKFILL posts of followee.
+            Once followee has more than TIMELINE_FANOUT_LIMIT
+            followers, all of its follows switch to fan-out on read.
+
+            Raises:
+            User.DoesNotExist: when followee is not found
+
+            Returns:
+            :return: tuple of (follow, created)
+        """
+        with transaction.atomic():
+            if not User.objects.filter(id=followee_id).exists():
+                raise User.DoesNotExist
+            follow, created = cls.objects.get_or_create(
+                follower_id=follower_id, followee_id=followee_id)
+            if not created:
+                return follow, False
+
+            limit = settings.TIMELINE_FANOUT_LIMIT
+            followers = cls.objects.filter(followee_id=followee_id)
+            if followers[limit:limit + 1].exists():
+                followers.filter(fanout=True).update(fanout=False)
+                follow.fanout = False
+            if follow.fanout:
+                posts = Post.objects.filter(author_id=followee_id).values_list(
+                    "id", "date_published")[:TIMELINE_BACKFILL]
+                TimelineEntry.objects.bulk_create(
+                    [TimelineEntry(user_id=follower_id, post_id=id,
+                                   date_published=date_published)
+                     for id, date_published in posts],
+                    ignore_conflicts=True,
+                )
+        return follow, True
+
+    @classmethod
+    def unfollow(cls, follower_id, followee_id):
+        """
+            unfollow() method removes the follow and the
+            followee's posts from the follower's timeline.
+
+            Returns:
+            :return: True when there was a follow to remove
+        """
+        with transaction.atomic():
+            deleted, _ = cls.objects.filter(
+                follower_id=follower_id, followee_id=followee_id).delete()
+            TimelineEntry.objects.filter(
+                user_id=follower_id, post__author_id=followee_id).delete()
+        return bool(deleted)
+
+
+class TimelineEntry(models.Model):
+    """
+    Materialized home timeline: one row per post pushed
+    to a user by fan-out on write. date_published is copied
+    from the post, so a page is read from the index alone.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    date_published = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.post_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_timeline_user_post"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-date_published", "-post"],
+                         name="timeline_user_published_idx"),
+        ]
+
+    @classmethod
+    def fan_out_many(cls, posts, batch_size=1000):
+        """
+            fan_out_many() method pushes new posts of one author
+            into the timelines of the author and of the followers
+            the author fans out to. Followers are read once for all
+            posts, a page at a time, and their entries written
+            about batch_size at a time. Outside of a transaction
+            (the fan_out task) every batch commits on its own,
+            a rerun skips the entries that already landed.
+        """
+        if not posts:
+            return
+        author_id = posts[0].author_id
+        follows = Follow.objects.filter(
+            followee_id=author_id, fanout=True
+        ).order_by("id").values_list("id", "follower_id")
+        per_batch = max(1, batch_size // len(posts))
+        # The author's own timeline goes with the first batch
+        user_ids, last_id = [author_id], 0
+        while True:
+            # Keyset over Follow ids, in follow_followee_fanout_idx order
+            page = list(follows.filter(id__gt=last_id)[:per_batch])
+            user_ids.extend(follower_id for _, follower_id in page)
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, post_id=post.id,
+                     date_published=post.date_published)
+                 for user_id in user_ids for post in posts],
+                ignore_conflicts=True)
+            if len(page) < per_batch:
+                return
+            user_ids, last_id = [], page[-1][0]
+
 
 def pre_save_post_receiver(sender, instance, *args, **kwargs):
+    if instance.pk is not None:
+        invalidate_post(instance.pk)
     if not instance.slug:
-        instance.slug = slugify(instance.author.username +
-                                "-" + instance.title)
+        base = Post.make_slug(instance.author.username, instance.title)
+        instance.slug = SlugCounter.allocate([base])[0]
 
 
 pre_save.connect(pre_save_post_receiver, sender=Post)
+
+
+def post_save_post_receiver(sender, instance, created, *args, **kwargs):
+    if created:
+        # Drops a lookup of the new id cached as missing
+        invalidate_post(instance.pk)
+        tasks.enqueue(tasks.fan_out, [instance.pk],
+                      key=f"fan_out:{instance.pk}")
+    tasks.enqueue(tasks.sync_search, [instance.pk],
+                  key=f"search:{instance.pk}")
+
+
+post_save.connect(post_save_post_receiver, sender=Post)
+
+
+def post_delete_post_receiver(sender, instance, *args, **kwargs):
+    tasks.enqueue(tasks.sync_search, [instance.pk],
+                  key=f"search:{instance.pk}")
+
+
+post_delete.connect(post_delete_post_receiver, sender=Post)
+
+
+class Job(models.Model):
+    """
+    Task queued by app.tasks.enqueue() for the run_tasks workers.
+    'key' deduplicates: an enqueue whose key is already waiting
+    is dropped. A worker clears it when it claims the job, so work
+    enqueued while a job runs is queued again rather than lost.
+    Jobs are deleted once done, failed ones stay with their
+    last_error after TASK_MAX_ATTEMPTS attempts.
+    """
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    key = models.CharField(max_length=200, null=True, unique=True)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    # Set while a worker runs the job, expired locks are reclaimed
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name}{tuple(self.args)}"
+
+    class Meta:
+        indexes = [
+            # Due jobs, see app.tasks.claim()
+            models.Index(fields=["run_at", "id"], name="job_run_at_idx"),
+        ]
@@ -0,0 +1,176 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(date_published, id):
+    """
+    Packs the (date_published, id) position of a post
+    into an opaque url-safe cursor string.
+    """
+    raw = f"{date_published.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Reverse of encode_cursor().
+
+    Raises:
+    ValidationError: when cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        date_published = parse_datetime(date_part)
+        id = int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        date_published = None
+    if date_published is None:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return date_published, id
+
+
+class KeysetPagination:
+    """
+    Keyset (seek) pagination over ("-date_published", "-id"),
+    matching Post.Meta.ordering and the post_published_id_idx index.
+    Every page is a single index range scan of page_size + 1 rows,
+    so the cost doesn't grow with the depth of the page.
+
+    Query params:
+    :cursor: opaque cursor taken from the previous page's Link header
+    :page_size: number of rows per page, at most MAX_PAGE_SIZE
+
+    id_field names the tie breaker column, it is "post_id"
+    for tables keyed on a copy of the post's position.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    id_field = "id"
+
+    def __init__(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        self.position = decode_cursor(cursor) if cursor else None
+        self.next_position = None
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return DEFAULT_PAGE_SIZE
+        try:
+            page_size = int(value)
+        except ValueError:
+            page_size = 0
+        if page_size < 1:
+            raise ValidationError(
+                {"page_size": "Must be a positive integer."})
+        return min(page_size, MAX_PAGE_SIZE)
+
+    def filter_queryset(self, queryset):
+        """
+        Narrows queryset to the rows after the cursor position.
+        The redundant date_published__lte bound lets the database
+        seek into the index instead of filtering from its start.
+        """
+        queryset = queryset.order_by("-date_published", f"-{self.id_field}")
+        if self.position is None:
+            return queryset
+        date_published, id = self.position
+        return queryset.filter(date_published__lte=date_published).filter(
+            Q(date_published__lt=date_published)
+            | Q(**{f"{self.id_field}__lt": id})
+        )
+
+    def paginate_queryset(self, queryset):
+        """
+        Returns the list of rows for the current page
+        and remembers the position of the next one.
+        """
+        rows = list(self.filter_queryset(queryset)[: self.page_size + 1])
+        return self.paginate_rows(rows)
+
+    def paginate_rows(self, rows):
+        """
+        Trims rows already fetched in order, at most page_size + 1
+        of them, to the current page and remembers the next position.
+        """
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            last = rows[-1]
+            self.next_position = (
+                last.date_published, getattr(last, self.id_field))
+        return rows
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(*self.next_position)
+        )
+
+    def get_paginated_response(self, data, status):
+        """
+        Keeps the body a plain list, the next page
+        is announced with a RFC 8288 Link header.
+        """
+        return self.add_link_header(Response(data, status=status))
+
+    def add_link_header(self, response):
+        next_link = self.get_next_link()
+        if next_link is not None:
+            response["Link"] = f'<{next_link}>; rel="next"'
+        return response
+
+
+class OffsetPagination(KeysetPagination):
+    """
+    Page number pagination for results that have no stable
+    position to seek from, like ranked search hits.
+    Same page_size and Link header as KeysetPagination.
+
+    Query params:
+    :page: 1 based page number
+    :page_size: number of rows per page, at most MAX_PAGE_SIZE
+    """
+
+    page_query_param = "page"
+
+    def __init__(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        value = request.query_params.get(self.page_query_param, "1")
+        try:
+            self.page = int(value)
+        except ValueError:
+            self.page = 0
+        if self.page < 1:
+            raise ValidationError({"page": "Must be a positive integer."})
+        self.offset = (self.page - 1) * self.page_size
+        self.has_next = False
+
+    def paginate_rows(self, rows):
+        """
+        Trims rows[offset:offset + page_size + 1] to the current page.
+        """
+        self.has_next = len(rows) > self.page_size
+        return rows[: self.page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page + 1)
@@ -0,0 +1,35 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .metrics import timed_serialization
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer counting its time as serialization time
+    of the request in app.metrics.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept application/x-ndjson.
+    Streaming views bypass it and write their lines directly,
+    it only renders non-streamed responses such as errors
+    as a single JSON line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return (json.dumps(data, ensure_ascii=False,
+                           separators=(",", ":")) + "\n").encode()
@@ -0,0 +1,38 @@
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+
+# Set by ReplicaRoutingMiddleware for the views of safe requests
+use_replica = contextvars.ContextVar("use_replica", default=False)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of GET / HEAD views to the "replica" database
+    when one is configured, everything else to the primary.
+
+    Reads inside a transaction of the primary stay on the primary,
+    so a view never mixes its own writes with replica reads.
+    Replica lag is visible to clients right after their writes;
+    the post cache is always filled from the primary (see
+    app.views._load_post_payload), so lag is never cached.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (use_replica.get() and REPLICA in settings.DATABASES
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets the schema by replication
+        return db != REPLICA
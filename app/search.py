@@ -0,0 +1,153 @@
+"""
+Full-text search over Post.title and Post.post.
+
+The backend is picked with the SEARCH_BACKEND setting, by default
+SQLiteFTSBackend on SQLite and DatabaseSearchBackend elsewhere.
+Backends are kept in sync by the sync_search task (app.tasks),
+queued from the Post signals and from Post.publish_many().
+`python manage.py rebuild_search_index` rebuilds them from scratch.
+"""
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+# Terms of a query past this are ignored
+MAX_QUERY_TERMS = 16
+
+
+def parse_query(query):
+    """
+    Splits a user query into search terms,
+    punctuation and operators are dropped.
+    """
+    return re.findall(r"\w+", query)[:MAX_QUERY_TERMS]
+
+
+class SearchBackend:
+    """
+    Interface of search backends. Every method
+    runs in the transaction of the caller.
+    """
+
+    def index(self, posts):
+        """
+        Adds or replaces posts, objects with id, title and post.
+        """
+        raise NotImplementedError
+
+    def remove(self, ids):
+        raise NotImplementedError
+
+    def search(self, terms, offset, limit):
+        """
+        Returns ids of the posts matching all terms,
+        the last one as a prefix, best ranked first.
+        """
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Inverted index in the app_post_fts FTS5 virtual table,
+    created by migration 0011, rowid is the post id.
+    Ranked by bm25 with the title weighted 10 to 1
+    against the text, configured as the table's rank.
+    """
+
+    table = "app_post_fts"
+
+    def index(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (rowid, title, post) "
+                "VALUES (%s, %s, %s)",
+                [(post.id, post.title, post.post) for post in posts],
+            )
+
+    def remove(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+
+    def search(self, terms, offset, limit):
+        if not terms:
+            return []
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                "ORDER BY rank, rowid DESC LIMIT %s OFFSET %s",
+                [" ".join(quoted), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, post) "
+                "SELECT id, title, post FROM app_post"
+            )
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Fallback for databases without a configured index:
+    scans Post with icontains, posts matching in the title first,
+    newest first. Nothing to keep in sync.
+    """
+
+    def index(self, posts):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def search(self, terms, offset, limit):
+        from django.db.models import Case, Q, Value, When
+
+        from .models import Post
+
+        if not terms:
+            return []
+        queryset = Post.objects.all()
+        title_match = Q()
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(post__icontains=term))
+            title_match &= Q(title__icontains=term)
+        queryset = queryset.annotate(
+            title_match=Case(When(title_match, then=Value(0)),
+                             default=Value(1)))
+        return list(
+            queryset.order_by("title_match", "-date_published", "-id")
+            .values_list("id", flat=True)[offset:offset + limit]
+        )
+
+    def rebuild(self):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _load_backend(path, vendor):
+    if not path:
+        path = ("app.search.SQLiteFTSBackend" if vendor == "sqlite"
+                else "app.search.DatabaseSearchBackend")
+    return import_string(path)()
+
+
+def get_backend():
+    return _load_backend(settings.SEARCH_BACKEND, connection.vendor)
@@ -1,12 +1,37 @@
+import json
+
 from rest_framework import serializers
-from .models import Post, Like
+from .models import Post, Like, Follow
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 
 class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = "__all__"
+        # Slugs are handed out by SlugCounter, a client picked one
+        # could take a "--<n>" suffix the counter hands out later
+        read_only_fields = ["like_count", "slug"]
+
+    def update(self, instance, validated_data):
+        # Saves only the submitted fields, so like_count of a
+        # possibly stale instance never overwrites concurrent toggles
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
+
+class PostBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One post of a post_bulk request, validated
+    without queries, the author is the request user.
+    """
+
+    class Meta:
+        model = Post
+        fields = ["title", "post"]
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -15,6 +40,167 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class FollowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Follow
+        fields = "__all__"
+
+
+def format_datetime(value, tz=None):
+    """
+    Formats datetime exactly like DRF DateTimeField does
+    with the default ISO 8601 DATETIME_FORMAT.
+    Pass tz when formatting many values, looking up
+    the current timezone is the costly part.
+    """
+    if value is None:
+        return None
+    if tz is None:
+        tz = timezone.get_current_timezone()
+    value = value.astimezone(tz).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for hot list endpoints.
+    Builds dicts straight from values_list(*fields) tuples,
+    skipping model instantiation and per-field DRF machinery.
+    Subclasses list fields in the order of the ModelSerializer
+    they stand in for, so the rendered JSON is byte-identical.
+
+    Usage:
+    rows = PostValuesSerializer.values(Post.objects.all())
+    PostValuesSerializer(rows, many=True).data
+    """
+
+    fields = ()
+    datetime_fields = ()
+    datetime_indexes = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.datetime_indexes = [
+            cls.fields.index(field) for field in cls.datetime_fields]
+
+    def __init__(self, instance, many=False):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        Narrows queryset to the serialized columns,
+        rows are named tuples, so they also work with
+        code expecting attributes, like KeysetPagination.
+        """
+        return queryset.values_list(*cls.fields, named=True)
+
+    @classmethod
+    def to_representation(cls, row, tz=None):
+        if tz is None:
+            tz = timezone.get_current_timezone()
+        row = list(row)
+        for index in cls.datetime_indexes:
+            row[index] = format_datetime(row[index], tz)
+        return dict(zip(cls.fields, row))
+
+    @property
+    def data(self):
+        tz = timezone.get_current_timezone()
+        if self.many:
+            return [self.to_representation(row, tz) for row in self.instance]
+        return self.to_representation(self.instance, tz)
+
+
+class PostValuesSerializer(ValuesSerializer):
+    """
+    Read-only stand-in for PostSerializer.
+    """
+
+    fields = ("id", "title", "post", "slug", "date_published",
+              "like_count", "updated_at", "author")
+    datetime_fields = ("date_published", "updated_at")
+
+
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    """
+    Public profile of a post's author, embedded
+    in posts with ?expand=author.
+    """
+
+    class Meta:
+        model = get_user_model()
+        fields = ["id", "username", "first_name", "last_name", "date_joined"]
+
+
+class PostAuthorValuesSerializer(PostValuesSerializer):
+    """
+    PostValuesSerializer with "author" expanded to
+    an AuthorSummarySerializer object, read with one join.
+    """
+
+    author_fields = AuthorSummarySerializer.Meta.fields[1:]
+    fields = PostValuesSerializer.fields + tuple(
+        f"author__{field}" for field in author_fields)
+    datetime_fields = PostValuesSerializer.datetime_fields + (
+        "author__date_joined",)
+
+    @classmethod
+    def to_representation(cls, row, tz=None):
+        data = super().to_representation(row, tz)
+        author = {"id": data["author"]}
+        for field in cls.author_fields:
+            author[field] = data.pop(f"author__{field}")
+        data["author"] = author
+        return data
+
+
+class LikeValuesSerializer(ValuesSerializer):
+    """
+    Read-only stand-in for LikeSerializer.
+    """
+
+    fields = ("id", "date", "liked", "user", "post")
+    datetime_fields = ("date",)
+
+
+class PostNDJSONEncoder:
+    """
+    Lightweight encoder for bulk export of Post rows as NDJSON,
+    one JSON object per line, on top of PostValuesSerializer.
+    """
+
+    fields = PostValuesSerializer.fields
+
+    def __init__(self, lines_per_chunk=500):
+        self.lines_per_chunk = lines_per_chunk
+        self.tz = timezone.get_current_timezone()
+
+    def encode(self, row):
+        line = json.dumps(PostValuesSerializer.to_representation(row, self.tz),
+                          ensure_ascii=False, separators=(",", ":"))
+        # Same escaping of JS line terminators as DRF JSONRenderer
+        return line.replace("\u2028", "\\u2028").replace(
+            "\u2029", "\\u2029")
+
+    def iter_chunks(self, rows):
+        """
+        Yields utf-8 encoded chunks of lines_per_chunk lines
+        to keep the number of writes to the socket low.
+        """
+        lines = []
+        for row in rows:
+            lines.append(self.encode(row))
+            if len(lines) >= self.lines_per_chunk:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
 #   from django.contrib.auth.models import User
 #   class RegistrationSerializer(serializers.ModelSerializer):
 #     class Meta:
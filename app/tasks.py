@@ -0,0 +1,206 @@
+"""
+Background tasks: side effects of post writes and like toggles
+that don't have to happen inside the request, queued in the Job
+table and run by `python manage.py run_tasks` workers.
+
+enqueue() inserts the job once the surrounding transaction
+commits, so a rolled back write queues nothing and a worker never
+sees a job before the rows it reads. A job runs in a transaction
+together with its own deletion, so its database work lands exactly
+once; failed jobs are retried with exponential backoff. Tasks
+registered with atomic=False must be idempotent instead: they
+commit as they go, keeping the write lock of SQLite for short
+stretches, and may run again after a failure or a lost lock.
+
+With TASKS_EAGER (on in tests) tasks run at once in the caller,
+in its transaction, as they did before the queue existed.
+"""
+import datetime
+import json
+import logging
+import traceback
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import models, search
+
+logger = logging.getLogger(__name__)
+
+# Task name -> function, filled by @task
+registry = {}
+
+# Due jobs a worker looks at per claim
+CLAIM_BATCH = 10
+
+
+class LockLost(Exception):
+    """
+    The lock of a running job expired and another worker
+    claimed it, the work of this run is rolled back
+    (unless the task isn't atomic, see task()).
+    """
+
+
+def task(func=None, *, atomic=True):
+    """
+    Registers func as a task, its arguments must be JSON values.
+    With atomic=False the task runs outside of a transaction,
+    see the module docstring. Use as @task or @task(atomic=False).
+    """
+    if func is None:
+        return lambda func: task(func, atomic=atomic)
+    func.task_name = f"{func.__module__}.{func.__qualname__}"
+    func.atomic = atomic
+    registry[func.task_name] = func
+    return func
+
+
+def enqueue(func, *args, key=None, with_writes=False):
+    """
+    Queues func(*args) when the current transaction commits,
+    at once outside of one. With 'key', the job is dropped
+    if a job of the same key is waiting to run. With
+    'with_writes', the job is inserted in the current transaction
+    instead, so no one sees the writes it follows up without it.
+    """
+    # Round trip through JSON, eager runs see what a worker would
+    args = json.loads(json.dumps(args))
+    if settings.TASKS_EAGER:
+        func(*args)
+        return
+    if with_writes:
+        _insert(func.task_name, args, key)
+        return
+    transaction.on_commit(lambda: _insert(func.task_name, args, key))
+
+
+def _insert(name, args, key):
+    try:
+        with transaction.atomic():
+            models.Job.objects.create(name=name, args=args, key=key)
+    except IntegrityError:
+        # A job of the same key is waiting
+        pass
+
+
+def retry_delay(attempts):
+    """
+    Returns the delay before the next run of a job failed
+    attempts times: TASK_RETRY_DELAY seconds, doubling every time.
+    """
+    return datetime.timedelta(
+        seconds=settings.TASK_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim():
+    """
+    Locks a due job for TASK_TIMEOUT seconds and clears its key.
+    Any worker may claim it again once the lock expires, e.g.
+    when its worker died; a run that outlived its lock is then
+    rolled back (see run()), so jobs commit at most once.
+
+    Returns:
+    :return: the claimed Job, or None when nothing is due
+    """
+    now = timezone.now()
+    unlocked = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    due = models.Job.objects.filter(
+        unlocked, run_at__lte=now, attempts__lt=settings.TASK_MAX_ATTEMPTS,
+    ).order_by("run_at", "id").values_list("id", flat=True)[:CLAIM_BATCH]
+    locked_until = now + datetime.timedelta(seconds=settings.TASK_TIMEOUT)
+    for id in due:
+        # Conditional, a concurrent worker may have taken it
+        if models.Job.objects.filter(unlocked, id=id).update(
+                locked_until=locked_until, key=None):
+            return models.Job.objects.get(id=id)
+    return None
+
+
+def run(job):
+    """
+    Runs a claimed job and deletes it in one transaction,
+    rolled back if the job was claimed again meanwhile.
+    Tasks registered with atomic=False commit as they go,
+    only the final delete is conditional on the lock.
+    On failure it is unlocked and scheduled for a retry.
+
+    Returns:
+    :return: True when the job succeeded
+    """
+    func = registry[job.name]
+    try:
+        with transaction.atomic() if func.atomic else nullcontext():
+            func(*job.args)
+            deleted, _ = models.Job.objects.filter(
+                id=job.id, locked_until=job.locked_until).delete()
+            if not deleted:
+                raise LockLost
+        return True
+    except LockLost:
+        # The job belongs to the worker that reclaimed it
+        logger.warning("Task %s outlived its lock", job)
+        return False
+    except Exception:
+        logger.exception("Task %s failed", job)
+        attempts = job.attempts + 1
+        # Unless reclaimed meanwhile
+        models.Job.objects.filter(
+            id=job.id, locked_until=job.locked_until).update(
+            attempts=attempts, run_at=timezone.now() + retry_delay(attempts),
+            locked_until=None, last_error=traceback.format_exc())
+        return False
+
+
+def run_pending():
+    """
+    Runs the due jobs until none is left.
+
+    Returns:
+    :return: tuple of (succeeded, failed) counts
+    """
+    succeeded = failed = 0
+    job = claim()
+    while job is not None:
+        if run(job):
+            succeeded += 1
+        else:
+            failed += 1
+        job = claim()
+    return succeeded, failed
+
+
+@task
+def sync_search(post_ids):
+    """
+    Indexes the posts of post_ids, drops the deleted ones from the index.
+    """
+    posts = list(models.Post.objects.filter(id__in=post_ids).only(
+        "id", "title", "post"))
+    backend = search.get_backend()
+    backend.index(posts)
+    backend.remove(set(post_ids) - {post.id for post in posts})
+
+
+@task(atomic=False)
+def fan_out(post_ids):
+    """
+    Pushes new posts of one author into the timelines,
+    see TimelineEntry.fan_out_many(), a transaction per batch.
+    Deleted posts are skipped.
+    """
+    models.TimelineEntry.fan_out_many(list(models.Post.objects.filter(
+        id__in=post_ids).only("id", "author_id", "date_published")))
+
+
+@task
+def bump_like_stats(changes):
+    """
+    LikeStat.bump() of changes with ISO formatted dates.
+    """
+    models.LikeStat.bump([(parse_datetime(date), post_id, delta)
+                          for date, post_id, delta in changes])
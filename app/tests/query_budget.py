@@ -0,0 +1,66 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Data sizes every budgeted call is repeated at
+SIZES = (1, 10, 50)
+
+_select = re.compile(r"^SELECT (?:DISTINCT )?(.*?) FROM ", re.DOTALL)
+
+
+def selected_columns(sql):
+    """
+    Returns the selected expressions of a SELECT statement,
+    e.g. ['"app_post"."id"', '"app_post"."title"'].
+    """
+    match = _select.match(sql)
+    if match is None:
+        raise AssertionError(f"Not a SELECT: {sql}")
+    return [column.strip() for column in match.group(1).split(", ")]
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin pinning the number of queries of a call,
+    whatever the size of the data it runs over.
+    """
+
+    def assertQueryBudget(self, budget, grow, call, sizes=SIZES):
+        """
+        Calls grow(size) to bring the data to every size of sizes
+        in turn and call() at each of them. Fails unless every call
+        makes the same number of queries, at most budget, so an
+        N+1 query shows up as soon as a second row exists.
+
+        Returns:
+        :return: captured queries of the call at the largest size
+        """
+        counts = []
+        for size in sizes:
+            grow(size)
+            with CaptureQueriesContext(connection) as queries:
+                call()
+            counts.append(len(queries))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Queries grow with the data, {dict(zip(sizes, counts))}:\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries))
+        self.assertLessEqual(
+            counts[0], budget,
+            "Over budget:\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries))
+        return queries.captured_queries
+
+    def assertSelects(self, query, columns, **joined):
+        """
+        Fails unless query selects exactly columns of its table,
+        given as field column names, in any order, and the columns
+        of joined tables given as table=[column, ...].
+        """
+        table = re.search(r' FROM "(\w+)"', query["sql"]).group(1)
+        joined[table] = columns
+        self.assertCountEqual(
+            selected_columns(query["sql"]),
+            [f'"{table}"."{column}"'
+             for table, columns in joined.items() for column in columns])
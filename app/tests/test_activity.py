@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.test import force_authenticate
+from app import activity
+from app.models import UserActivity
+from app.views import user_activity
+
+
+class TestActivity(TestCase):
+
+    def setUp(self):
+        activity.flush()
+        self.factory = RequestFactory()
+        self.users = [
+            User.objects.create_user(username=f"user-{i}",
+                                     password="1234567")
+            for i in range(5)
+        ]
+
+    def test_record_coalesces_per_user(self):
+        earlier = timezone.now() - timedelta(minutes=5)
+        now = timezone.now()
+        activity.record(self.users[0].id, earlier)
+        activity.record(self.users[0].id, now)
+        self.assertEqual(activity.pending_last_request(self.users[0].id), now)
+        self.assertEqual(activity.flush(), 1)
+        self.assertIsNone(activity.pending_last_request(self.users[0].id))
+        self.assertEqual(
+            UserActivity.objects.get(user=self.users[0]).last_request, now)
+
+    def test_flush_in_constant_queries(self):
+        now = timezone.now()
+        UserActivity.objects.create(user=self.users[0], last_request=now)
+        for user in self.users:
+            activity.record(user.id, now)
+        with self.assertNumQueries(4):
+            activity.flush()
+        self.assertEqual(UserActivity.objects.count(), len(self.users))
+
+    def test_flush_keeps_newer_time(self):
+        now = timezone.now()
+        UserActivity.objects.create(user=self.users[0], last_request=now)
+        activity.record(self.users[0].id, now - timedelta(minutes=5))
+        activity.flush()
+        self.assertEqual(
+            UserActivity.objects.get(user=self.users[0]).last_request, now)
+
+    @override_settings(ACTIVITY_FLUSH_INTERVAL=3600)
+    def test_middleware_records_authenticated_requests(self):
+        token = RefreshToken.for_user(self.users[1]).access_token
+        self.client.get("/api/post/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertIsNotNone(activity.pending_last_request(self.users[1].id))
+        self.assertEqual(UserActivity.objects.count(), 0)
+
+    def test_user_activity_single_query(self):
+        now = timezone.now()
+        activity.record(self.users[2].id, now)
+        request = self.factory.get('/user-activity')
+        force_authenticate(request, user=self.users[2])
+        with self.assertNumQueries(1):
+            response = user_activity(request)
+        self.assertEqual(response.data["last_request"], now)
+        self.assertIsNone(response.data["last_like"])
+        self.assertIsNone(response.data["last_post"])
@@ -0,0 +1,99 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TransactionTestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from app.models import Post, Like
+
+
+class TestAsyncViews(TransactionTestCase):
+    """
+    Async routes answer like their sync counterparts.
+    Transactional, as the pool threads of app.asyncdb
+    use their own database connections.
+    """
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567',
+                                              email='petya@gmail.com')
+        self.posts = [
+            Post.objects.create(author=self.user1, title=f"Title {i}",
+                                post="A lot of text")
+            for i in range(3)
+        ]
+        Like.toggle(self.user1.id, self.posts[0].id)
+        token = RefreshToken.for_user(self.user1).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.async_client = AsyncClient()
+
+    def async_get(self, url, **meta):
+        # AsyncClient of Django 3.1 takes header names, not META keys
+        headers = {key[5:].replace("_", "-").lower(): value
+                   for key, value in meta.items()}
+        return self.async_client.get(url, **headers)
+
+    async def assert_same(self, url, **headers):
+        response = await self.async_get(
+            f"/api/async/{url}", **self.auth, **headers)
+        expected = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.client.get(f"/api/{url}", **self.auth,
+                                          **headers))
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        for header in ("ETag", "Last-Modified"):
+            self.assertEqual(response.get(header), expected.get(header))
+        self.assertEqual(
+            response.get("Link", "").replace("/api/async/", "/api/"),
+            expected.get("Link", ""))
+        return response
+
+    async def test_post_collection(self):
+        response = await self.assert_same("post/?page_size=2")
+        self.assertIn("Link", response)
+        self.assertIn("Server-Timing", response)
+
+    async def test_post_collection_not_modified(self):
+        response = await self.async_get("/api/async/post/", **self.auth)
+        response = await self.async_get(
+            "/api/async/post/", HTTP_IF_NONE_MATCH=response["ETag"],
+            **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_post_element(self):
+        await self.assert_same(f"post/{self.posts[0].id}")
+        await self.assert_same("post/100500")
+
+    async def test_expand_author(self):
+        await self.assert_same("post/?expand=author")
+        await self.assert_same(f"post/{self.posts[0].id}?expand=author")
+        response = await self.assert_same("post/?expand=comments")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_analytics(self):
+        await self.assert_same("analytics/?date_from=2020-01-01"
+                               "&date_to=2040-01-01")
+        await self.assert_same("analytics/?date_from=2020-01-01")
+
+    async def test_user_activity(self):
+        # The first request is recorded by ActivityMiddleware
+        for _ in range(2):
+            response = await self.async_get("/api/async/user-activity/",
+                                            **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.json()["last_request"])
+
+    async def test_requires_token(self):
+        response = await self.async_client.get("/api/async/post/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_get(
+            "/api/async/post/", HTTP_AUTHORIZATION="Bearer nonsense")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_read_only(self):
+        response = await self.async_client.post(
+            "/api/async/post/", {},
+            authorization=self.auth["HTTP_AUTHORIZATION"])
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
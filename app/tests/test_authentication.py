@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+from app.authentication import LazyTokenUser
+from app.models import Follow, Like, Post
+from app.views import (
+    post_bulk, post_bulk_like, post_collection, post_like, user_follow)
+
+
+class TestLazyTokenUser(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567',
+                                              email='petya@gmail.com')
+        self.post1 = Post.objects.create(author=self.user1,
+                                         title="Very first title",
+                                         post="A lot of text")
+        self.token = RefreshToken.for_user(self.user1).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+    def test_id_without_query(self):
+        user = LazyTokenUser(self.token)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.id, self.user1.id)
+            self.assertTrue(user.is_authenticated)
+
+    def test_full_user_loaded_lazily_once(self):
+        user = LazyTokenUser(self.token)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'Petya')
+            self.assertEqual(user.email, 'petya@gmail.com')
+            self.assertFalse(user.is_staff)
+
+    def test_post_collection_without_user_query(self):
+        request = self.factory.get("/post", **self.auth)
+        # Posts and liked_by_me, none for the user
+        with self.assertNumQueries(2):
+            response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_post_like_with_token(self):
+        request = self.factory.put('/post/{post_id}/like', **self.auth)
+        response = post_like(request, self.post1.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["user"], self.user1.id)
+
+    def test_invalid_token(self):
+        request = self.factory.get("/post",
+                                   HTTP_AUTHORIZATION="Bearer broken")
+        response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestDeletedTokenUser(TransactionTestCase):
+    """
+    The token outlives its user. Transactions commit, so the
+    deferred foreign key checks of SQLite run in the view.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567')
+        self.user2 = User.objects.create_user(username='Vasya',
+                                              password='1234567')
+        self.post1 = Post.objects.create(author=self.user2,
+                                         title="Very first title",
+                                         post="A lot of text")
+        token = RefreshToken.for_user(self.user1).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.user1.delete()
+
+    def assertUnauthorized(self, response):
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["detail"].code, "user_not_found")
+
+    def test_user_attribute(self):
+        request = self.factory.get("/post", **self.auth)
+        request = post_collection.cls().initialize_request(request)
+        with self.assertRaises(AuthenticationFailed):
+            request.user.username
+
+    def test_post_like(self):
+        request = self.factory.put('/post/{post_id}/like', **self.auth)
+        self.assertUnauthorized(post_like(request, self.post1.id))
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(Post.objects.get(id=self.post1.id).like_count, 0)
+
+    def test_post_bulk_like(self):
+        request = self.factory.put('/post/bulk/like', [self.post1.id],
+                                   content_type="application/json",
+                                   **self.auth)
+        self.assertUnauthorized(post_bulk_like(request))
+        self.assertFalse(Like.objects.exists())
+
+    def test_user_follow(self):
+        request = self.factory.put('/user/{user_id}/follow', **self.auth)
+        self.assertUnauthorized(user_follow(request, self.user2.id))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_post_bulk(self):
+        request = self.factory.post(
+            '/post/bulk', [{"title": "Title", "post": "Text"}],
+            content_type="application/json", **self.auth)
+        self.assertUnauthorized(post_bulk(request))
+        self.assertEqual(Post.objects.count(), 1)
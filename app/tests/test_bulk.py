@@ -0,0 +1,130 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from app.models import (
+    Follow, Like, LikeStat, Post, PostLikeStat, TimelineEntry)
+from app.views import BULK_MAX_ITEMS, post_bulk, post_bulk_like
+
+
+class TestBulk(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="Petya",
+                                             password="1234567")
+        self.follower = User.objects.create_user(username="Vasya",
+                                                 password="1234567")
+        Follow.follow(self.follower.id, self.user.id)
+
+    def post_bulk(self, items):
+        request = self.factory.post("/api/post/bulk", json.dumps(items),
+                                    content_type="application/json")
+        force_authenticate(request, user=self.user)
+        return post_bulk(request)
+
+    def like_bulk(self, post_ids):
+        request = self.factory.put("/api/post/bulk/like",
+                                   json.dumps(post_ids),
+                                   content_type="application/json")
+        force_authenticate(request, user=self.user)
+        return post_bulk_like(request)
+
+    def test_post_bulk_created(self):
+        items = [{"title": f"Title {i}", "post": "text"} for i in range(20)]
+        # Fan-out and indexing tasks run eagerly, reading the posts back
+        with self.assertNumQueries(14):
+            response = self.post_bulk(items)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([post["title"] for post in response.data],
+                         [item["title"] for item in items])
+        self.assertEqual(response.data[0]["slug"], "petya-title-0")
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.follower).count(), 20)
+
+    def test_post_bulk_errors_per_item(self):
+        items = [
+            {"title": "Fine", "post": "text"},
+            {"title": "", "post": "text"},
+            {"title": "Fine too"},
+        ]
+        response = self.post_bulk(items)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("title", response.data[1])
+        self.assertIn("post", response.data[2])
+        self.assertFalse(Post.objects.exists())
+
+    def test_post_bulk_duplicate_titles(self):
+        Post.objects.create(author=self.user, title="Taken", post="text")
+        items = [{"title": "Taken", "post": "text"},
+                 {"title": "Twice", "post": "text"},
+                 {"title": "Twice", "post": "text"}]
+        response = self.post_bulk(items)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([post["slug"] for post in response.data],
+                         ["petya-taken--2", "petya-twice", "petya-twice--2"])
+
+    def test_post_bulk_bad_request(self):
+        self.assertEqual(self.post_bulk({"title": "x"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post_bulk([]).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_like_bulk_toggles(self):
+        posts = [Post.objects.create(author=self.user, title=f"Title {i}",
+                                     post="text") for i in range(3)]
+        Like.toggle(self.user.id, posts[0].id)
+        ids = [post.id for post in posts] + [0]
+        response = self.like_bulk(ids)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["status"] for item in response.data],
+                         [202, 201, 201, 404])
+        self.assertEqual([item["like"] and item["like"]["liked"]
+                          for item in response.data],
+                         [False, True, True, None])
+        self.assertEqual(
+            list(Post.objects.order_by("id").values_list(
+                "like_count", flat=True)),
+            [0, 1, 1])
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, 2)
+        self.assertEqual(
+            dict(PostLikeStat.objects.filter(
+                granularity=LikeStat.MONTH).values_list(
+                "post_id", "total_likes")),
+            {ids[0]: 0, ids[1]: 1, ids[2]: 1})
+
+        response = self.like_bulk(ids[:3])
+        self.assertEqual([item["like"]["liked"] for item in response.data],
+                         [True, False, False])
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, 1)
+
+    def test_like_bulk_constant_queries(self):
+        posts = [Post.objects.create(author=self.user, title=f"Title {i}",
+                                     post="text") for i in range(30)]
+        with self.assertNumQueries(15):
+            self.like_bulk([post.id for post in posts])
+
+    def test_like_bulk_max_items(self):
+        posts = Post.publish_many(
+            self.user.id, self.user.username,
+            [{"title": f"Title {i}", "post": "text"}
+             for i in range(BULK_MAX_ITEMS)])
+        Like.toggle(self.user.id, posts[0].id)
+        response = self.like_bulk([post.id for post in posts])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, BULK_MAX_ITEMS - 1)
+        self.assertEqual(PostLikeStat.objects.filter(
+            granularity=LikeStat.HOUR, total_likes=1).count(),
+            BULK_MAX_ITEMS - 1)
+
+    def test_like_bulk_bad_request(self):
+        for data in ({"post": 1}, [], [1, 1], ["1"]):
+            self.assertEqual(self.like_bulk(data).status_code,
+                             status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,82 @@
+import threading
+import time
+import warnings
+
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from app.cache import (
+    MISSING, get_analytics, invalidate_analytics, invalidate_post,
+    load_post_payload, peek_post_payload, post_key, stats)
+
+
+class TestPostCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_read_through(self):
+        before = stats()
+        self.assertIsNone(peek_post_payload(1))
+        self.assertEqual(load_post_payload(1, lambda: {"id": 1}), {"id": 1})
+        self.assertEqual(peek_post_payload(1), {"id": 1})
+        after = stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+    def test_missing_post_cached_briefly(self):
+        self.assertIsNone(load_post_payload(2, lambda: None))
+        self.assertEqual(peek_post_payload(2), MISSING)
+        invalidate_post(2)
+        self.assertIsNone(peek_post_payload(2))
+
+    def test_waits_for_recompute_in_progress(self):
+        cache.add(f"{post_key(3)}:lock", 1)
+        timer = threading.Timer(
+            0.05, lambda: cache.set(post_key(3), {"id": 3}))
+        timer.start()
+        payload = load_post_payload(3, lambda: self.fail("stampede"))
+        timer.join()
+        self.assertEqual(payload, {"id": 3})
+
+    def test_waiters_see_missing_post(self):
+        cache.add(f"{post_key(5)}:lock", 1)
+        timer = threading.Timer(
+            0.05, lambda: cache.set(post_key(5), MISSING))
+        timer.start()
+        started = time.monotonic()
+        payload = load_post_payload(5, lambda: self.fail("stampede"))
+        timer.join()
+        self.assertIsNone(payload)
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_invalidate_post(self):
+        cache.set(post_key(4), {"id": 4})
+        invalidate_post(4)
+        self.assertIsNone(cache.get(post_key(4)))
+
+
+class TestAnalyticsCache(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidated_by_period_of_window(self):
+        now = timezone.localtime()
+        months = [(now.year, now.month)]
+        self.assertEqual(get_analytics("q", months, lambda: [1]), ([1], False))
+        self.assertEqual(get_analytics("q", months, list), ([1], True))
+        invalidate_analytics([now.replace(year=2000)])
+        self.assertEqual(get_analytics("q", months, list), ([1], True))
+        invalidate_analytics([now])
+        self.assertEqual(get_analytics("q", months, list), ([], False))
+
+    def test_long_window_key(self):
+        months = [(year, month) for year in range(2000, 2041)
+                  for month in range(1, 13)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            self.assertEqual(get_analytics("q", months, lambda: [1]),
+                             ([1], False))
+            self.assertEqual(get_analytics("q", months, list), ([1], True))
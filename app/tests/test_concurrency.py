@@ -0,0 +1,76 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from app.models import Post, Like, LikeStat
+
+
+class TestLikeToggleConcurrency(TransactionTestCase):
+    """
+    Many threads toggle likes of the same post at once,
+    each thread with its own database connection.
+    """
+
+    threads = 8
+    toggles_per_thread = 15
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"user-{i}",
+                                     password="1234567")
+            for i in range(self.threads)
+        ]
+        self.post1 = Post.objects.create(author=self.users[0],
+                                         title="Very first title",
+                                         post="A lot of text")
+
+    def run_in_threads(self, target):
+        errors = []
+
+        def worker(index):
+            try:
+                target(index)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,))
+                   for i in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_same_user_toggles_are_not_lost(self):
+        user_id = self.users[0].id
+
+        def toggle(index):
+            for _ in range(self.toggles_per_thread):
+                Like.toggle(user_id, self.post1.id)
+
+        self.run_in_threads(toggle)
+        like = Like.objects.get(user_id=user_id, post=self.post1)
+        total = self.threads * self.toggles_per_thread
+        self.assertEqual(like.liked, total % 2 == 1)
+        self.post1.refresh_from_db()
+        self.assertEqual(self.post1.like_count, int(like.liked))
+        total_likes = sum(LikeStat.objects.filter(
+            granularity=LikeStat.DAY).values_list("total_likes", flat=True))
+        self.assertEqual(total_likes, int(like.liked))
+
+    def test_first_likes_create_one_row_per_user(self):
+        def toggle(index):
+            Like.toggle(self.users[index].id, self.post1.id)
+
+        self.run_in_threads(toggle)
+        likes = Like.objects.filter(post=self.post1)
+        self.assertEqual(likes.count(), self.threads)
+        self.post1.refresh_from_db()
+        self.assertEqual(self.post1.like_count, self.threads)
+        self.assertTrue(all(like.liked for like in likes))
+        total_likes = sum(LikeStat.objects.filter(
+            granularity=LikeStat.DAY).values_list("total_likes", flat=True))
+        self.assertEqual(total_likes, self.threads)
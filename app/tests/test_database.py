@@ -0,0 +1,98 @@
+import os
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from app import database, routers
+from app.models import Post
+from social_net.settings import database_from_env
+
+
+class TestDatabase(TransactionTestCase):
+    """
+    Transactional, so the "replica" test mirror, a second
+    connection to the test database, sees the committed rows.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567')
+        self.post1 = Post.objects.create(author=self.user1,
+                                         title="Very first title",
+                                         post="A lot of text")
+        token = RefreshToken.for_user(self.user1).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    # No activity flush on the primary in the middle of the request
+    @override_settings(ACTIVITY_FLUSH_INTERVAL=3600)
+    def test_get_reads_replica(self):
+        with CaptureQueriesContext(connections["replica"]) as replica, \
+                CaptureQueriesContext(connections["default"]) as primary:
+            response = self.client.get("/api/post/", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["id"], self.post1.id)
+        self.assertEqual(len(replica), 2)
+        self.assertEqual(len(primary), 0)
+
+    @override_settings(ACTIVITY_FLUSH_INTERVAL=3600)
+    def test_get_element_reads_primary(self):
+        # The payload and its validators come from the primary,
+        # so does liked_by_me
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(f"/api/post/{self.post1.id}",
+                                       **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()["liked_by_me"])
+        self.assertEqual(len(replica), 0)
+
+    def test_writes_use_primary(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.post(
+                "/api/post/", {"title": "Second", "post": "text"},
+                **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica), 0)
+
+    def test_reads_in_transaction_use_primary(self):
+        router = routers.ReplicaRouter()
+        token = routers.use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Post), "replica")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), "default")
+        finally:
+            routers.use_replica.reset(token)
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_health_check_closes_broken_connection(self):
+        connection.ensure_connection()
+        connection.settings_dict["CONN_HEALTH_CHECKS"] = True
+        connection.is_usable = lambda: False
+        try:
+            database.check_connections()
+        finally:
+            del connection.is_usable
+        self.assertIsNone(connection.connection)
+        self.assertTrue(Post.objects.exists())
+
+    def test_database_from_env(self):
+        os.environ["TEST_DB_NAME"] = "replica.sqlite3"
+        try:
+            config = database_from_env("TEST_DB_", {"CONN_MAX_AGE": "5"})
+        finally:
+            del os.environ["TEST_DB_NAME"]
+        self.assertEqual(config["NAME"], "replica.sqlite3")
+        self.assertEqual(config["CONN_MAX_AGE"], 5)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
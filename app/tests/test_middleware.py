@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from app.models import Post
+
+
+class TestMetricsMiddleware(TestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567',
+                                              email='petya@gmail.com')
+        self.post1 = Post.objects.create(author=self.user1,
+                                         title="Very first title",
+                                         post="A lot of text")
+        token = RefreshToken.for_user(self.user1).access_token
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/post/", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        server_timing = response["Server-Timing"]
+        self.assertIn('desc="2 queries"', server_timing)
+        self.assertIn("ser;dur=", server_timing)
+        self.assertIn("total;dur=", server_timing)
+
+    def test_metrics_scrape(self):
+        self.client.get("/api/post/", **self.auth)
+        self.client.get(f"/api/post/{self.post1.id}", **self.auth)
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('social_net_request_duration_seconds_count'
+                      '{route="post-collection"}', body)
+        self.assertIn('social_net_db_queries_bucket'
+                      '{route="post-element",le="+Inf"}', body)
+        self.assertIn("social_net_post_cache_misses_total", body)
+
+    def test_metrics_scrape_forbidden(self):
+        response = self.client.get("/api/metrics/", REMOTE_ADDR="10.1.2.3")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_scrape_token(self):
+        # Required even from INTERNAL_IPS, a local proxy hides clients
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(
+            "/api/metrics/", REMOTE_ADDR="10.1.2.3",
+            HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,46 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+from app.models import LikeStat
+
+
+class TestLikeStatMigration(TransactionTestCase):
+    """
+    0012_like_stat_granularity builds the rollups of the existing likes.
+    """
+
+    before = [("app", "0011_post_search")]
+    after = [("app", "0012_like_stat_granularity")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_like_stats_built(self):
+        User = self.apps.get_model("auth", "User")
+        Post = self.apps.get_model("app", "Post")
+        Like = self.apps.get_model("app", "Like")
+        user1 = User.objects.create(username='Petya')
+        user2 = User.objects.create(username='Vasya')
+        post1 = Post.objects.create(author=user1, title="Very first title",
+                                    post="A lot of text", slug="first")
+        Like.objects.create(user=user1, post=post1, liked=True)
+        Like.objects.create(user=user2, post=post1, liked=False)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        for granularity, _ in LikeStat.GRANULARITIES:
+            period = LikeStat.period_start(timezone.now(), granularity)
+            stat = apps.get_model("app", "LikeStat").objects.get(
+                granularity=granularity)
+            self.assertEqual((stat.period, stat.total_likes), (period, 1))
+            stat = apps.get_model("app", "PostLikeStat").objects.get(
+                granularity=granularity)
+            self.assertEqual((stat.post_id, stat.total_likes), (post1.id, 1))
@@ -1,6 +1,10 @@
+import datetime
+
 from django.test import TestCase
-from app.models import Post, Like
+from app.models import (
+    Post, Like, LikeEvent, LikeStat, PostLikeStat, SlugCounter)
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class TestModels(TestCase):
@@ -29,6 +33,27 @@ class TestModels(TestCase):
     def test_post_slugify(self):
         self.assertEqual(self.post1.slug, 'petya-very-first-title')
 
+    def test_post_slug_duplicate_title(self):
+        posts = [Post.objects.create(author=self.user1,
+                                     title="Very first title",
+                                     post="More text") for _ in range(2)]
+        self.assertEqual([post.slug for post in posts],
+                         ['petya-very-first-title--2',
+                          'petya-very-first-title--3'])
+
+    def test_post_slug_truncated(self):
+        post = Post.objects.create(author=self.user1, title="A" * 200,
+                                   post="text")
+        self.assertEqual(post.slug, 'petya-' + 'a' * 36)
+        post = Post.objects.create(author=self.user1, title="A" * 200,
+                                   post="text")
+        self.assertEqual(len(post.slug), 45)
+
+    def test_slug_allocate_constant_queries(self):
+        with self.assertNumQueries(5):
+            slugs = SlugCounter.allocate(['a', 'b', 'a', 'c', 'a'])
+        self.assertEqual(slugs, ['a', 'b', 'a--2', 'c', 'a--3'])
+
     def test_like_created(self):
         self.assertTrue(Like.objects.get(id=self.like1.id))
 
@@ -40,3 +65,78 @@ class TestModels(TestCase):
         self.like1.like_unlike()
         self.like1.save()
         self.assertTrue(Like.objects.get(id=self.like1.id).liked)
+
+    def test_like_stat_bump(self):
+        now = timezone.now()
+        LikeStat.bump([(now, self.post1.id, 1), (now, self.post1.id, 1)])
+        with self.assertNumQueries(4):
+            LikeStat.bump([(now, self.post1.id, -1)])
+        for granularity, _ in LikeStat.GRANULARITIES:
+            period = LikeStat.period_start(now, granularity)
+            stat = LikeStat.objects.get(granularity=granularity,
+                                        period=period)
+            self.assertEqual(stat.total_likes, 1)
+            stat = PostLikeStat.objects.get(granularity=granularity,
+                                            period=period)
+            self.assertEqual(stat.post_id, self.post1.id)
+            self.assertEqual(stat.total_likes, 1)
+
+    def test_like_stat_period_start(self):
+        date = timezone.make_aware(datetime.datetime(2021, 2, 17, 13, 45))
+        expected = {
+            LikeStat.HOUR: datetime.datetime(2021, 2, 17, 13),
+            LikeStat.DAY: datetime.datetime(2021, 2, 17),
+            LikeStat.WEEK: datetime.datetime(2021, 2, 15),
+            LikeStat.MONTH: datetime.datetime(2021, 2, 1),
+        }
+        for granularity, start in expected.items():
+            self.assertEqual(LikeStat.period_start(date, granularity),
+                             timezone.make_aware(start))
+        self.assertEqual(
+            LikeStat.period_start(datetime.date(2021, 2, 17), LikeStat.WEEK),
+            timezone.make_aware(datetime.datetime(2021, 2, 15)))
+
+    def test_like_toggle(self):
+        like, created = Like.toggle(self.user1.id, self.post1.id)
+        self.assertFalse(created)
+        self.assertTrue(like.liked)
+        self.assertEqual(Post.objects.get(id=self.post1.id).like_count, 1)
+        like, created = Like.toggle(self.user1.id, self.post1.id)
+        self.assertFalse(like.liked)
+        self.assertEqual(Post.objects.get(id=self.post1.id).like_count, 0)
+        self.assertEqual(Like.objects.filter(user=self.user1).count(), 1)
+        self.assertEqual(
+            list(LikeEvent.objects.filter(user=self.user1).order_by(
+                "id").values_list("liked", flat=True)),
+            [True, False])
+
+    def test_like_event_replay_and_compact(self):
+        post2 = Post.objects.create(author=self.user1,
+                                    title="Another title",
+                                    post="Another text")
+        for _ in range(3):
+            Like.toggle(self.user1.id, self.post1.id)
+        for _ in range(2):
+            Like.toggle(self.user1.id, post2.id)
+        like = Like.objects.get(user=self.user1, post=self.post1)
+        expected = {(self.user1.id, self.post1.id): like.date}
+        self.assertEqual(LikeEvent.current_likes(), expected)
+
+        deleted = LikeEvent.compact(timezone.now())
+        self.assertEqual(deleted, 4)
+        event = LikeEvent.objects.get()
+        self.assertEqual((event.post_id, event.liked), (self.post1.id, True))
+        self.assertEqual(LikeEvent.current_likes(), expected)
+        self.assertEqual(LikeEvent.current_likes(since=timezone.now()), {})
+
+    def test_like_toggle_creates_liked(self):
+        post2 = Post.objects.create(author=self.user1,
+                                    title="Another title",
+                                    post="Another text")
+        like, created = Like.toggle(self.user1.id, post2.id)
+        self.assertTrue(created)
+        self.assertTrue(like.liked)
+
+    def test_like_toggle_post_does_not_exist(self):
+        with self.assertRaises(Post.DoesNotExist):
+            Like.toggle(self.user1.id, 100500)
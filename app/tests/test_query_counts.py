@@ -0,0 +1,204 @@
+import itertools
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from app.models import Follow, Like, Post
+from app.serializers import AuthorSummarySerializer, PostValuesSerializer
+from app.tests.query_budget import QueryBudgetMixin
+from app.views import (
+    analytics, post_bulk, post_bulk_like, post_by_slug, post_collection,
+    post_element, post_export, post_like, post_search, registration,
+    timeline, user_activity, user_follow)
+
+POST_COLUMNS = [
+    "author_id" if field == "author" else field
+    for field in PostValuesSerializer.fields
+]
+AUTHOR_COLUMNS = AuthorSummarySerializer.Meta.fields
+
+
+class TestQueryCounts(QueryBudgetMixin, TestCase):
+    """
+    Every endpoint makes the same number of queries
+    whatever the number of posts, likes and follows.
+    Background tasks run eagerly in tests, so their
+    queries count in the budget of the request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="reader",
+                                             password="1234567")
+        self.fan = User.objects.create_user(username="fan",
+                                            password="1234567")
+        self.counter = itertools.count()
+
+    def grow_posts(self, size, author=None):
+        """
+        Adds posts, each liked by fan, up to size posts of author.
+        """
+        author = author or self.user
+        for _ in range(size - Post.objects.filter(author=author).count()):
+            post = Post.objects.create(
+                author=author, title=f"Title {next(self.counter)}",
+                post="Some text")
+            Like.toggle(self.fan.id, post.id)
+
+    def call(self, view, method, url, *args, data=None):
+        if data is not None:
+            request = getattr(self.factory, method)(
+                url, json.dumps(data), content_type="application/json")
+        else:
+            request = getattr(self.factory, method)(url)
+        force_authenticate(request, user=self.user)
+        response = view(request, *args)
+        self.assertLess(response.status_code, 400, response)
+        return response
+
+    def test_post_collection_get(self):
+        queries = self.assertQueryBudget(2, self.grow_posts, lambda: self.call(
+            post_collection, "get", "/api/post/?page_size=100"))
+        self.assertSelects(queries[0], POST_COLUMNS)
+
+    def test_post_collection_expand_author(self):
+        def grow(size):
+            for index in range(User.objects.count(), size + 2):
+                author = User.objects.create_user(username=f"author-{index}",
+                                                  password="1234567")
+                self.grow_posts(1, author)
+
+        queries = self.assertQueryBudget(2, grow, lambda: self.call(
+            post_collection, "get", "/api/post/?page_size=100&expand=author"))
+        self.assertSelects(queries[0], POST_COLUMNS,
+                           auth_user=AUTHOR_COLUMNS[1:])
+
+    def test_post_collection_post(self):
+        self.assertQueryBudget(12, self.grow_posts, lambda: self.call(
+            post_collection, "post", "/api/post/",
+            data={"title": f"New {next(self.counter)}", "post": "text"}))
+
+    def test_post_element_get(self):
+        post = Post.objects.create(author=self.user, title="Title",
+                                   post="text")
+
+        def call():
+            cache.clear()
+            self.call(post_element, "get", f"/api/post/{post.id}", post.id)
+
+        queries = self.assertQueryBudget(2, self.grow_posts, call)
+        # The author summary is cached along with the post
+        self.assertSelects(queries[0], POST_COLUMNS,
+                           auth_user=AUTHOR_COLUMNS)
+
+    def test_post_by_slug(self):
+        post = Post.objects.create(author=self.user, title="Title",
+                                   post="text")
+
+        def call():
+            cache.clear()
+            self.call(post_by_slug, "get", f"/api/post/slug/{post.slug}",
+                      post.slug)
+
+        self.assertQueryBudget(3, self.grow_posts, call)
+
+    def test_post_element_put(self):
+        post = Post.objects.create(author=self.user, title="Title",
+                                   post="text")
+        self.assertQueryBudget(5, self.grow_posts, lambda: self.call(
+            post_element, "put", f"/api/post/{post.id}", post.id,
+            data={"title": "Title", "post": "Updated",
+                  "author": self.user.id}))
+
+    def test_post_element_delete(self):
+        def call():
+            post = Post.objects.latest("id")
+            self.call(post_element, "delete", f"/api/post/{post.id}",
+                      post.id)
+
+        self.assertQueryBudget(12, self.grow_posts, call)
+
+    def test_post_like(self):
+        post = Post.objects.create(author=self.user, title="Title",
+                                   post="text")
+        # Flips from here on, the first like inserts
+        Like.toggle(self.user.id, post.id)
+        self.assertQueryBudget(10, self.grow_posts, lambda: self.call(
+            post_like, "put", f"/api/post/{post.id}/like", post.id))
+
+    def test_post_bulk(self):
+        self.assertQueryBudget(14, self.grow_posts, lambda: self.call(
+            post_bulk, "post", "/api/post/bulk",
+            data=[{"title": f"Bulk {next(self.counter)}", "post": "text"}
+                  for _ in range(5)]))
+
+    def test_post_bulk_like_over_all_posts(self):
+        self.assertQueryBudget(16, self.grow_posts, lambda: self.call(
+            post_bulk_like, "put", "/api/post/bulk/like",
+            data=list(Post.objects.values_list("id", flat=True))))
+
+    def test_post_export(self):
+        def call():
+            response = self.call(post_export, "get", "/api/post/export")
+            b"".join(response.streaming_content)
+
+        self.assertQueryBudget(1, self.grow_posts, call)
+
+    def test_user_follow(self):
+        author = User.objects.create_user(username="author",
+                                          password="1234567")
+
+        def call():
+            url = f"/api/user/{author.id}/follow"
+            self.call(user_follow, "put", url, author.id)
+            self.call(user_follow, "delete", url, author.id)
+
+        self.assertQueryBudget(
+            14, lambda size: self.grow_posts(size, author), call)
+
+    def test_timeline(self):
+        def grow(size):
+            for index in range(Follow.objects.count(), size):
+                author = User.objects.create_user(username=f"author-{index}",
+                                                  password="1234567")
+                Follow.follow(self.user.id, author.id)
+                self.grow_posts(2, author)
+
+        self.assertQueryBudget(3, grow, lambda: self.call(
+            timeline, "get", "/api/timeline/?page_size=100"))
+
+    def test_post_search(self):
+        self.assertQueryBudget(2, self.grow_posts, lambda: self.call(
+            post_search, "get", "/api/search/?q=title&page_size=100"))
+
+    def test_analytics(self):
+        today = timezone.localdate().isoformat()
+        window = f"date_from={today}&date_to={today}"
+        for params in ("", "&granularity=hour", "&post=1",
+                       f"&author={self.user.id}", "&top=100"):
+            def call():
+                cache.clear()
+                self.call(analytics, "get", f"/api/analytics/?{window}"
+                          + params)
+
+            self.assertQueryBudget(1, self.grow_posts, call)
+
+    def test_user_activity(self):
+        self.assertQueryBudget(1, self.grow_posts, lambda: self.call(
+            user_activity, "get", "/api/user-activity/"))
+
+    def test_registration(self):
+        def call():
+            index = next(self.counter)
+            response = registration(self.factory.post(
+                "/api/account/register",
+                {"username": f"new-{index}", "email": f"{index}@mail.com",
+                 "password": "Secret-123", "password2": "Secret-123"}))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertQueryBudget(3, self.grow_posts, call)
@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from app.models import Post
+from app.search import get_backend, parse_query
+from app.views import post_search
+
+
+class TestSearch(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="Petya",
+                                             password="1234567")
+        self.in_text = Post.objects.create(
+            author=self.user, title="Morning notes",
+            post="Why trusting the science is complicated")
+        self.in_title = Post.objects.create(
+            author=self.user, title="Trusting the science",
+            post="A lot of text")
+        self.other = Post.objects.create(
+            author=self.user, title="Faster JavaScript calls",
+            post="By putting the number of arguments")
+
+    def search(self, url):
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        return post_search(request)
+
+    def ids(self, response):
+        return [post["id"] for post in response.data]
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query('sci* AND "trust" -x'),
+                         ["sci", "AND", "trust", "x"])
+
+    def test_title_matches_ranked_first(self):
+        response = self.search("/api/search/?q=trusting+science")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(response),
+                         [self.in_title.id, self.in_text.id])
+
+    def test_stemming_and_prefix(self):
+        self.assertEqual(self.ids(self.search("/api/search/?q=trusted")),
+                         [self.in_title.id, self.in_text.id])
+        self.assertEqual(self.ids(self.search("/api/search/?q=javas")),
+                         [self.other.id])
+
+    def test_index_follows_writes(self):
+        self.other.title = "Trusting nobody"
+        self.other.save()
+        self.in_text.delete()
+        response = self.search("/api/search/?q=trusting")
+        self.assertEqual(sorted(self.ids(response)),
+                         sorted([self.in_title.id, self.other.id]))
+        self.assertEqual(self.search("/api/search/?q=faster").data, [])
+
+    def test_bulk_created_posts_indexed(self):
+        Post.publish_many(self.user.id, self.user.username,
+                          [{"title": "Bulk science", "post": "text"}])
+        response = self.search("/api/search/?q=bulk")
+        self.assertEqual([post["title"] for post in response.data],
+                         ["Bulk science"])
+
+    def test_paginated(self):
+        response = self.search("/api/search/?q=the&page_size=1")
+        self.assertEqual(self.ids(response), [self.in_title.id])
+        next_link = response["Link"][1:-len('>; rel="next"')]
+        self.assertIn("page=2", next_link)
+        response = self.search("/api/search/?q=the&page_size=2&page=2")
+        self.assertEqual(len(response.data), 1)
+        self.assertFalse(response.has_header("Link"))
+
+    def test_bad_request(self):
+        for url in ("/api/search/", "/api/search/?q=%2B%2B",
+                    "/api/search/?q=x&page=0"):
+            self.assertEqual(self.search(url).status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM app_post_fts")
+        self.assertEqual(get_backend().search(["science"], 0, 10), [])
+        call_command("rebuild_search_index", stdout=open("/dev/null", "w"))
+        self.assertEqual(len(get_backend().search(["science"], 0, 10)), 2)
+
+    @override_settings(SEARCH_BACKEND="app.search.DatabaseSearchBackend")
+    def test_database_backend(self):
+        response = self.search("/api/search/?q=trusting+scien")
+        self.assertEqual(self.ids(response),
+                         [self.in_title.id, self.in_text.id])
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from app.models import Post, Like
+from app.serializers import (
+    PostSerializer, LikeSerializer, PostValuesSerializer,
+    LikeValuesSerializer)
+
+
+class TestValuesSerializers(TestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567',
+                                              email='petya@gmail.com')
+        self.post1 = Post.objects.create(author=self.user1,
+                                         title="Very first title",
+                                         post="A lot of text")
+        self.post2 = Post.objects.create(author=self.user1,
+                                         title="Ünïcode   title",
+                                         post="Ещё \"текст\"")
+        Like.toggle(self.user1.id, self.post1.id)
+
+    def assertSameJSON(self, serializer, values_serializer, queryset):
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer(queryset, many=True).data)
+        rows = values_serializer.values(queryset)
+        actual = renderer.render(values_serializer(rows, many=True).data)
+        self.assertEqual(actual, expected)
+
+    def test_post_values_serializer_identical_json(self):
+        self.assertSameJSON(PostSerializer, PostValuesSerializer,
+                            Post.objects.all())
+
+    def test_like_values_serializer_identical_json(self):
+        self.assertSameJSON(LikeSerializer, LikeValuesSerializer,
+                            Like.objects.all())
+
+    def test_single_row(self):
+        row = PostValuesSerializer.values(Post.objects.all()).first()
+        self.assertEqual(PostValuesSerializer(row).data,
+                         PostSerializer(Post.objects.first()).data)
@@ -0,0 +1,193 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from app import search, tasks
+from app.models import Follow, Job, Like, LikeStat, Post, TimelineEntry
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task
+def fail():
+    raise RuntimeError("boom")
+
+
+@tasks.task
+def count_like(post_id):
+    Post.objects.filter(id=post_id).update(like_count=F("like_count") + 1)
+
+
+@override_settings(TASKS_EAGER=False, TASK_RETRY_DELAY=10,
+                   TASK_MAX_ATTEMPTS=2)
+class TestTasks(TransactionTestCase):
+    """
+    Queued mode, transactions commit so on_commit enqueues run.
+    """
+
+    def setUp(self):
+        calls.clear()
+        self.author = User.objects.create_user(username='Petya',
+                                               password='1234567')
+        self.follower = User.objects.create_user(username='Vasya',
+                                                 password='1234567')
+        Follow.follow(self.follower.id, self.author.id)
+
+    def test_enqueued_on_commit(self):
+        with transaction.atomic():
+            tasks.enqueue(record, 1)
+            self.assertFalse(Job.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.args), (record.task_name, [1]))
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_rollback_enqueues_nothing(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            tasks.enqueue(record, 1)
+            raise ValueError
+        self.assertFalse(Job.objects.exists())
+
+    def test_deduplicated_by_key(self):
+        tasks.enqueue(record, 1, key="k")
+        tasks.enqueue(record, 1, key="k")
+        tasks.enqueue(record, 2)
+        self.assertEqual(Job.objects.count(), 2)
+
+        # A job running clears its key, later work is queued again
+        job = tasks.claim()
+        self.assertIsNone(job.key)
+        tasks.enqueue(record, 1, key="k")
+        self.assertEqual(Job.objects.count(), 3)
+        tasks.run(job)
+        tasks.run_pending()
+        self.assertEqual(calls, [1, 2, 1])
+
+    def test_retry_with_backoff(self):
+        tasks.enqueue(fail)
+        with self.assertLogs("app.tasks", "ERROR"):
+            self.assertEqual(tasks.run_pending(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(job.locked_until)
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=9))
+        # Not due yet
+        self.assertIsNone(tasks.claim())
+
+        later = timezone.now() + timedelta(seconds=11)
+        with mock.patch("app.tasks.timezone.now", return_value=later), \
+                self.assertLogs("app.tasks", "ERROR"):
+            self.assertEqual(tasks.run_pending(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 2)
+        self.assertGreater(job.run_at, later + timedelta(seconds=19))
+        # Out of attempts, kept for inspection
+        with mock.patch("app.tasks.timezone.now",
+                        return_value=later + timedelta(days=1)):
+            self.assertIsNone(tasks.claim())
+
+    def test_expired_lock_reclaimed(self):
+        tasks.enqueue(record, 1)
+        self.assertIsNotNone(tasks.claim())
+        self.assertIsNone(tasks.claim())
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch("app.tasks.timezone.now", return_value=later):
+            self.assertIsNotNone(tasks.claim())
+
+    def test_run_past_lock_rolled_back(self):
+        post = Post.objects.create(author=self.author, title="Title",
+                                   post="text")
+        tasks.run_pending()
+        tasks.enqueue(count_like, post.id)
+        stale = tasks.claim()
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch("app.tasks.timezone.now", return_value=later):
+            fresh = tasks.claim()
+        with self.assertLogs("app.tasks", "WARNING"):
+            self.assertFalse(tasks.run(stale))
+        self.assertEqual(Post.objects.get(id=post.id).like_count, 0)
+        self.assertEqual(Job.objects.get().locked_until, fresh.locked_until)
+        self.assertTrue(tasks.run(fresh))
+        self.assertEqual(Post.objects.get(id=post.id).like_count, 1)
+
+    def test_post_side_effects_queued(self):
+        post = Post.objects.create(author=self.author, title="Queued title",
+                                   post="Some text")
+        post.post = "Edited text"
+        post.save()
+        self.assertEqual(sorted(Job.objects.values_list("key", flat=True)),
+                         [f"fan_out:{post.id}", f"search:{post.id}"])
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(search.get_backend().search(["queued"], 0, 10), [])
+
+        call_command("run_tasks", "--once", stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.follower, post=post).count(), 1)
+        self.assertEqual(search.get_backend().search(["edited"], 0, 10),
+                         [post.id])
+
+        post.delete()
+        tasks.run_pending()
+        self.assertEqual(search.get_backend().search(["edited"], 0, 10), [])
+
+    def test_like_stats_queued(self):
+        post = Post.objects.create(author=self.author, title="Title",
+                                   post="text")
+        Like.toggle(self.follower.id, post.id)
+        Like.toggle_many(self.author.id, [post.id])
+        self.assertEqual(Post.objects.get(id=post.id).like_count, 2)
+        self.assertFalse(LikeStat.objects.exists())
+        tasks.run_pending()
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, 2)
+
+    def test_fan_out_commits_per_batch(self):
+        for username in ['Masha', 'Dasha']:
+            Follow.follow(User.objects.create_user(username=username).id,
+                          self.author.id)
+        in_atomic_block = []
+        fan_out_many = TimelineEntry.fan_out_many
+
+        def fan_out_in_batches(posts):
+            in_atomic_block.append(connection.in_atomic_block)
+            fan_out_many(posts, batch_size=1)
+
+        with mock.patch.object(TimelineEntry, "fan_out_many",
+                               side_effect=fan_out_in_batches):
+            post = Post.objects.create(author=self.author, title="Title",
+                                       post="text")
+            tasks.run_pending()
+        self.assertEqual(in_atomic_block, [False])
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 4)
+
+    def test_backfill_applies_pending_like_stats(self):
+        post = Post.objects.create(author=self.author, title="Title",
+                                   post="text")
+        tasks.run_pending()
+        Like.toggle(self.follower.id, post.id)
+        call_command("backfill_like_stats", stdout=StringIO())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, 1)
+
+        # A worker that claimed the job before the backfill rolls back
+        Like.toggle(self.author.id, post.id)
+        job = tasks.claim()
+        call_command("backfill_like_stats", stdout=StringIO())
+        with self.assertLogs("app.tasks", "WARNING"):
+            self.assertFalse(tasks.run(job))
+        self.assertEqual(LikeStat.objects.get(
+            granularity=LikeStat.DAY).total_likes, 2)
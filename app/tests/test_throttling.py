@@ -0,0 +1,164 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from app import throttling
+from app.metrics import DecayingAverage
+from app.models import Post
+from app.views import post_bulk_like, post_collection, post_like
+
+RATES = {"write": "2/min", "write_ip": "100/min", "like": "3/min"}
+
+
+def with_rates(rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates})
+
+
+@with_rates(RATES)
+class TestThrottling(TestCase):
+
+    def setUp(self):
+        throttling.local_store.clear()
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user1 = User.objects.create_user(username='Petya',
+                                              password='1234567')
+        self.user2 = User.objects.create_user(username='Vasya',
+                                              password='1234567')
+        self.post1 = Post.objects.create(author=self.user1,
+                                         title="Very first title",
+                                         post="A lot of text")
+
+    def create_post(self, user, **meta):
+        request = self.factory.post(
+            "/api/post/", {"title": "Title", "post": "Text"}, **meta)
+        force_authenticate(request, user=user)
+        return post_collection(request)
+
+    def like(self, user):
+        request = self.factory.put(f"/api/post/{self.post1.id}/like")
+        force_authenticate(request, user=user)
+        return post_like(request, self.post1.id)
+
+    def test_write_bucket_per_user(self):
+        for _ in range(2):
+            response = self.create_post(self.user1)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.create_post(self.user1)
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+        response = self.create_post(self.user2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_reads_not_throttled(self):
+        for _ in range(3):
+            request = self.factory.get("/api/post/")
+            force_authenticate(request, user=self.user1)
+            self.assertEqual(post_collection(request).status_code,
+                             status.HTTP_200_OK)
+
+    def test_bucket_refills(self):
+        with mock.patch("app.throttling.time.time", return_value=1000.0):
+            for _ in range(2):
+                self.create_post(self.user1)
+            self.assertEqual(self.create_post(self.user1).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+        with mock.patch("app.throttling.time.time", return_value=1030.0):
+            self.assertEqual(self.create_post(self.user1).status_code,
+                             status.HTTP_201_CREATED)
+
+    def test_likes_have_own_budget(self):
+        for _ in range(2):
+            self.create_post(self.user1)
+        for _ in range(3):
+            self.assertLess(self.like(self.user1).status_code, 300)
+        self.assertEqual(self.like(self.user1).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bulk_likes_pay_per_post(self):
+        post2 = Post.objects.create(author=self.user1, title="Second title",
+                                    post="More text")
+        request = self.factory.put(
+            "/api/post/bulk/like", [self.post1.id, post2.id],
+            content_type="application/json")
+        force_authenticate(request, user=self.user1)
+        self.assertEqual(post_bulk_like(request).status_code,
+                         status.HTTP_200_OK)
+        self.assertLess(self.like(self.user1).status_code, 300)
+        self.assertEqual(self.like(self.user1).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bulk_like_over_capacity(self):
+        posts = [self.post1.id] + [
+            Post.objects.create(author=self.user1, title=f"Title {i}",
+                                post="Text").id for i in range(4)]
+        with mock.patch("app.throttling.time.time", return_value=1000.0):
+            request = self.factory.put("/api/post/bulk/like", posts,
+                                       content_type="application/json")
+            force_authenticate(request, user=self.user1)
+            # Takes the full bucket
+            self.assertEqual(post_bulk_like(request).status_code,
+                             status.HTTP_200_OK)
+            self.assertEqual(self.like(self.user1).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_full_buckets_dropped(self):
+        store = throttling.LocalBucketStore()
+        store.take("a", 2, 60, 1000.0)
+        store.take("b", 2, 60, 1010.0)
+        self.assertEqual(list(store._buckets), ["a", "b"])
+        # "a" refilled at 1030, "b" is still refilling
+        store.take("c", 2, 60, 1035.0)
+        self.assertEqual(list(store._buckets), ["b", "c"])
+        store.take("b", 2, 60, 1040.0)
+        self.assertEqual(list(store._buckets), ["c", "b"])
+        # A dropped bucket starts full again
+        self.assertEqual(store.take("a", 2, 60, 1040.0), 0)
+
+    @with_rates({"write_ip": "1/min"})
+    def test_ip_bucket(self):
+        meta = {"REMOTE_ADDR": "10.0.0.1"}
+        self.assertEqual(self.create_post(self.user1, **meta).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(self.create_post(self.user2, **meta).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.create_post(self.user2).status_code,
+                         status.HTTP_201_CREATED)
+
+    @override_settings(THROTTLE_STORE="cache")
+    def test_cache_store(self):
+        for _ in range(2):
+            self.create_post(self.user1)
+        throttling.local_store.clear()
+        self.assertEqual(self.create_post(self.user1).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOAD_SHED_WRITE_WAIT=0.1)
+    def test_load_shedding(self):
+        average = DecayingAverage()
+        average.observe(1.0)
+        with mock.patch("app.throttling.db_write_wait", average):
+            response = self.create_post(self.user1)
+            self.assertEqual(response.status_code,
+                             status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response["Retry-After"], "1")
+            request = self.factory.get("/api/post/")
+            force_authenticate(request, user=self.user1)
+            self.assertEqual(post_collection(request).status_code,
+                             status.HTTP_200_OK)
+        self.assertEqual(self.create_post(self.user1).status_code,
+                         status.HTTP_201_CREATED)
+
+    def test_decaying_average_recovers(self):
+        average = DecayingAverage(weight=1.0, half_life=1.0)
+        with mock.patch("app.metrics.time.monotonic", return_value=0.0):
+            average._updated = 0.0
+            average.observe(0.8)
+        with mock.patch("app.metrics.time.monotonic", return_value=2.0):
+            self.assertAlmostEqual(average.value(), 0.2)
@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from app.models import Post, Follow, TimelineEntry
+from app.views import timeline, user_follow
+
+
+class TestTimeline(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reader = User.objects.create_user(username="reader",
+                                               password="1234567")
+        self.authors = [
+            User.objects.create_user(username=f"author-{i}",
+                                     password="1234567")
+            for i in range(3)
+        ]
+
+    def get_timeline(self, url="/api/timeline/"):
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.reader)
+        return timeline(request)
+
+    def create_post(self, author, title):
+        return Post.objects.create(author=author, title=title, post="text")
+
+    def test_follow_backfills_timeline(self):
+        post = self.create_post(self.authors[0], "Before follow")
+        request = self.factory.put(f"/api/user/{self.authors[0].id}/follow")
+        force_authenticate(request, user=self.reader)
+        response = user_follow(request, self.authors[0].id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+
+        response = user_follow(request, self.authors[0].id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_follow_errors(self):
+        request = self.factory.put("/api/user/0/follow")
+        force_authenticate(request, user=self.reader)
+        self.assertEqual(user_follow(request, 0).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(user_follow(request, self.reader.id).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_post_fans_out_to_followers(self):
+        Follow.follow(self.reader.id, self.authors[0].id)
+        post = self.create_post(self.authors[0], "After follow")
+        self.create_post(self.authors[1], "Not followed")
+        response = self.get_timeline()
+        self.assertEqual([row["id"] for row in response.data], [post.id])
+
+    def test_unfollow_removes_posts(self):
+        Follow.follow(self.reader.id, self.authors[0].id)
+        self.create_post(self.authors[0], "After follow")
+        request = self.factory.delete(
+            f"/api/user/{self.authors[0].id}/follow")
+        force_authenticate(request, user=self.reader)
+        response = user_follow(request, self.authors[0].id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_timeline().data, [])
+        response = user_follow(request, self.authors[0].id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_merges_pulled_authors(self):
+        other = User.objects.create_user(username="other",
+                                         password="1234567")
+        Follow.follow(other.id, self.authors[0].id)
+        Follow.follow(self.reader.id, self.authors[0].id)
+        Follow.follow(self.reader.id, self.authors[1].id)
+        self.assertFalse(Follow.objects.get(
+            follower=self.reader, followee=self.authors[0]).fanout)
+
+        posts = [
+            self.create_post(self.authors[i % 2], f"Title {i}")
+            for i in range(5)
+        ]
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, post__author=self.authors[0]).exists())
+
+        with self.assertNumQueries(3):
+            response = self.get_timeline("/api/timeline/?page_size=3")
+        self.assertEqual([row["id"] for row in response.data],
+                         [post.id for post in posts[::-1][:3]])
+        next_link = response["Link"][1:-len('>; rel="next"')]
+        response = self.get_timeline(next_link)
+        self.assertEqual([row["id"] for row in response.data],
+                         [post.id for post in posts[::-1][3:]])
+        self.assertFalse(response.has_header("Link"))
+
+    def test_own_posts_in_timeline(self):
+        post = self.create_post(self.reader, "Mine")
+        self.assertEqual([row["id"] for row in self.get_timeline().data],
+                         [post.id])
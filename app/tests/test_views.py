@@ -1,10 +1,16 @@
+import time
+
 from django.core.exceptions import ValidationError
 from django.test import RequestFactory, TestCase
-from app.models import Post, Like
-from app.views import registration, post_collection, \
-    post_element, post_like, analytics, user_activity
+from app.models import Post, Like, LikeStat
+from app.views import registration, post_collection, post_export, \
+    post_element, post_like, analytics, user_activity, post_by_slug
 from app.serializers import PostSerializer
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import force_authenticate
 from rest_framework import status
 
@@ -12,6 +18,7 @@ from rest_framework import status
 class TestViews(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.factory = RequestFactory()
         self.user1 = User.objects.create_user(username='Petya',
                                               password='1234567',
@@ -74,8 +81,128 @@ class TestViews(TestCase):
         posts = Post.objects.all()
         serializer = PostSerializer(posts, many=True)
         response = post_collection(request)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data, [dict(post, liked_by_me=False)
+                                         for post in serializer.data])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_liked_by_me(self):
+        user2 = User.objects.create_user(username='Vasya',
+                                         password='1234567',
+                                         email='vasya@gmail.com')
+        Like.toggle(self.user1.id, self.post1.id)
+        responses = {}
+        for user in (self.user1, user2):
+            request = self.factory.get("/post")
+            force_authenticate(request, user=user)
+            page = post_collection(request)
+            self.assertIn("Authorization", page["Vary"])
+            request = self.factory.get(f"/post/{self.post1.id}")
+            force_authenticate(request, user=user)
+            element = post_element(request, self.post1.id)
+            self.assertIn("Authorization", element["Vary"])
+            responses[user] = (page, element)
+            liked = user == self.user1
+            for post in (page.data[0], element.data):
+                self.assertEqual(post["liked_by_me"], liked)
+                self.assertEqual(post["like_count"], 1)
+        # Same posts, different bodies, so different validators
+        for index in range(2):
+            self.assertNotEqual(responses[self.user1][index]["ETag"],
+                                responses[user2][index]["ETag"])
+
+    def test_post_collection_get_paginated(self):
+        for i in range(4):
+            Post.objects.create(author=self.user1,
+                                title=f"Title {i}",
+                                post="Paginated text")
+        request = self.factory.get("/post", {"page_size": 2})
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(len(response.data), 2)
+        self.assertIn('rel="next"', response["Link"])
+
+        seen = [post["id"] for post in response.data]
+        while response.has_header("Link"):
+            next_url = response["Link"][1:response["Link"].index(">")]
+            request = self.factory.get(next_url)
+            force_authenticate(request, user=self.user1)
+            response = post_collection(request)
+            seen += [post["id"] for post in response.data]
+        expected = list(Post.objects.values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_post_collection_expand_author(self):
+        request = self.factory.get("/post", {"expand": "author"})
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(response.data[0]["author"], {
+            "id": self.user1.id,
+            "username": "Petya",
+            "first_name": "",
+            "last_name": "",
+            "date_joined": JSONRenderer().render(
+                self.user1.date_joined).decode().strip('"'),
+        })
+
+        request = self.factory.get("/post", {"expand": "author,comments"})
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_element_expand_author(self):
+        url = f"/post/{self.post1.id}"
+        for x_cache in ("MISS", "HIT"):
+            request = self.factory.get(url, {"expand": "author"})
+            force_authenticate(request, user=self.user1)
+            response = post_element(request, self.post1.id)
+            self.assertEqual(response["X-Cache"], x_cache)
+            self.assertEqual(response.data["author"]["username"], "Petya")
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, self.post1.id)
+        self.assertEqual(response.data["author"], self.user1.id)
+
+    def test_post_collection_get_invalid_cursor(self):
+        request = self.factory.get("/post", {"cursor": "not-a-cursor"})
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_collection_conditional_get(self):
+        request = self.factory.get("/post")
+        force_authenticate(request, user=self.user1)
+        etag = post_collection(request)["ETag"]
+
+        request = self.factory.get("/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Post.objects.create(author=self.user1,
+                            title="Fresh title",
+                            post="Fresh text")
+        request = self.factory.get("/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_post_collection_ignores_if_modified_since(self):
+        post = Post.objects.create(author=self.user1,
+                                   title="Doomed title",
+                                   post="Doomed text")
+        request = self.factory.get("/post")
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
+        self.assertNotIn("Last-Modified", response)
+
+        post.delete()
+        request = self.factory.get(
+            "/post", HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        force_authenticate(request, user=self.user1)
+        response = post_collection(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
 
     def test_post_collection_get_auth_error(self):
         request = self.factory.get("/post")
@@ -103,6 +230,26 @@ class TestViews(TestCase):
         response = post_collection(request)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_post_export_ndjson(self):
+        Post.objects.create(author=self.user1,
+                            title="Ünïcode \u2028 title",
+                            post="Exported text")
+        request = self.factory.get("/post/export",
+                                   HTTP_ACCEPT="application/x-ndjson")
+        force_authenticate(request, user=self.user1)
+        response = post_export(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        expected = [JSONRenderer().render(PostSerializer(post).data)
+                    for post in Post.objects.all()]
+        self.assertEqual(lines, expected)
+
+    def test_post_export_auth_error(self):
+        request = self.factory.get("/post/export")
+        response = post_export(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_post_element_get_does_not_exist(self):
         post_id = 100500
         request = self.factory.get('/post/{post_id}/')
@@ -117,6 +264,102 @@ class TestViews(TestCase):
         response = post_element(request, post_id)
         self.assertEqual(response.data['title'], "Very first title")
 
+    def test_post_by_slug(self):
+        request = self.factory.get('/post/slug/petya-very-first-title')
+        force_authenticate(request, user=self.user1)
+        response = post_by_slug(request, self.post1.slug)
+        self.assertEqual(response.data['id'], self.post1.id)
+        response = post_by_slug(request, 'missing')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_post_element_get_cached(self):
+        post_id = self.post1.id
+        responses = []
+        for _ in range(2):
+            request = self.factory.get('/post/{post_id}/')
+            force_authenticate(request, user=self.user1)
+            responses.append(post_element(request, post_id))
+        self.assertEqual(responses[0]["X-Cache"], "MISS")
+        self.assertEqual(responses[1]["X-Cache"], "HIT")
+        self.assertEqual(responses[0].data, responses[1].data)
+
+    def test_post_element_cache_invalidated_on_write(self):
+        post_id = self.post1.id
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        post_element(request, post_id)
+
+        request = self.factory.put('/post/{post_id}/like')
+        force_authenticate(request, user=self.user1)
+        post_like(request, post_id)
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["like_count"], 1)
+
+        request = self.factory.delete('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        post_element(request, post_id)
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_post_element_missing_cached(self):
+        post_id = 100500
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        Post.objects.create(id=post_id, author=self.user1,
+                            title="Late title", post="Late text")
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_post_element_conditional_get(self):
+        post_id = self.post1.id
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        etag = post_element(request, post_id)["ETag"]
+
+        for clear_cache in (False, True):
+            if clear_cache:
+                cache.clear()
+            request = self.factory.get('/post/{post_id}/',
+                                       HTTP_IF_NONE_MATCH=etag)
+            force_authenticate(request, user=self.user1)
+            response = post_element(request, post_id)
+            self.assertEqual(response.status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+
+        request = self.factory.put('/post/{post_id}/like')
+        force_authenticate(request, user=self.user1)
+        post_like(request, post_id)
+        request = self.factory.get('/post/{post_id}/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_post_element_if_modified_since(self):
+        post_id = self.post1.id
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        last_modified = post_element(request, post_id)["Last-Modified"]
+        request = self.factory.get('/post/{post_id}/',
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_post_element_put(self):
         post_id = self.post1.id
         data = {
@@ -133,6 +376,26 @@ class TestViews(TestCase):
         self.assertEqual(response.data['title'], "the Bellagio, the Mirage")
 
 
+    def test_post_element_put_ignores_slug(self):
+        post_id = self.post1.id
+        data = {"author": self.user1.id, "title": "Same",
+                "post": "Text", "slug": "petya-same--2"}
+        request = self.factory.put('/post/{post_id}/', data,
+                                   content_type='application/json')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, post_id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["slug"], "petya-very-first-title")
+
+        # The counter's suffixes stay free
+        for slug in ("petya-same", "petya-same--2"):
+            request = self.factory.post("/post", {"title": "Same",
+                                                  "post": "Text"})
+            force_authenticate(request, user=self.user1)
+            response = post_collection(request)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data["slug"], slug)
+
     def test_post_element_put_bad_request(self):
         post_id = self.post1.id
         data = {
@@ -159,6 +422,29 @@ class TestViews(TestCase):
         response = post_like(request, post_id)
         self.assertTrue(response.data['liked'])
 
+    def test_post_like_updates_like_count(self):
+        request = self.factory.put('/post/{post_id}/like')
+        force_authenticate(request, user=self.user1)
+        post_like(request, self.post1.id)
+        request = self.factory.get('/post/{post_id}/')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, self.post1.id)
+        self.assertEqual(response.data['like_count'], 1)
+
+    def test_post_element_put_ignores_like_count(self):
+        data = {
+            "author": self.user1.id,
+            "title": "the Bellagio, the Mirage",
+            "post": "So here is the plan...",
+            "like_count": 100500,
+        }
+        request = self.factory.put('/post/{post_id}/',
+                                   data,
+                                   content_type='application/json')
+        force_authenticate(request, user=self.user1)
+        response = post_element(request, self.post1.id)
+        self.assertEqual(response.data['like_count'], 0)
+
     def test_post_like_post_does_not_exist(self):
         post_id = 100500
         request = self.factory.put('/post/{post_id}/like')
@@ -187,6 +473,99 @@ class TestViews(TestCase):
         response = analytics(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_analytics_reads_daily_rollup(self):
+        request = self.factory.put('/post/{post_id}/like')
+        force_authenticate(request, user=self.user1)
+        post_like(request, self.post1.id)
+        today = timezone.localdate()
+        LikeStat.objects.create(
+            granularity=LikeStat.DAY,
+            period=LikeStat.period_start(today.replace(year=2000),
+                                         LikeStat.DAY),
+            total_likes=7)
+
+        data = {'date_from': today.isoformat(), 'date_to': today.isoformat()}
+        request = self.factory.get('/analytics', data)
+        force_authenticate(request, user=self.user1)
+        response = analytics(request)
+        self.assertEqual(response.data, [{"day": today.day,
+                                          "month": today.month,
+                                          "year": today.year,
+                                          "total_likes": 1}])
+
+    def test_analytics_rollup_follows_unlike(self):
+        for _ in range(2):
+            request = self.factory.put('/post/{post_id}/like')
+            force_authenticate(request, user=self.user1)
+            post_like(request, self.post1.id)
+        stat = LikeStat.objects.get(
+            granularity=LikeStat.DAY,
+            period=LikeStat.period_start(timezone.now(), LikeStat.DAY))
+        self.assertEqual(stat.total_likes, 0)
+
+    def test_analytics_granularity(self):
+        Like.toggle(self.user1.id, self.post1.id)
+        now = timezone.localtime()
+        today = now.date().isoformat()
+        data = {'date_from': today, 'date_to': today, 'granularity': 'hour'}
+        request = self.factory.get('/analytics', data)
+        force_authenticate(request, user=self.user1)
+        response = analytics(request)
+        self.assertEqual(response.data, [{"day": now.day,
+                                          "month": now.month,
+                                          "year": now.year,
+                                          "total_likes": 1,
+                                          "hour": now.hour}])
+
+        data['granularity'] = 'month'
+        request = self.factory.get('/analytics', data)
+        force_authenticate(request, user=self.user1)
+        response = analytics(request)
+        self.assertEqual(response.data, [{"day": 1,
+                                          "month": now.month,
+                                          "year": now.year,
+                                          "total_likes": 1}])
+
+        data['granularity'] = 'year'
+        request = self.factory.get('/analytics', data)
+        force_authenticate(request, user=self.user1)
+        response = analytics(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_analytics_post_author_and_top(self):
+        user2 = User.objects.create_user(username='Vasya',
+                                         password='1234567',
+                                         email='vasya@gmail.com')
+        post2 = Post.objects.create(author=user2, title="Another title",
+                                    post="Another text")
+        Like.toggle(self.user1.id, self.post1.id)
+        Like.toggle(self.user1.id, post2.id)
+        Like.toggle(user2.id, post2.id)
+        today = timezone.localdate()
+
+        def get(**params):
+            data = {'date_from': today.isoformat(),
+                    'date_to': today.isoformat(), **params}
+            request = self.factory.get('/analytics', data)
+            force_authenticate(request, user=self.user1)
+            return analytics(request)
+
+        self.assertEqual(get(post=post2.id).data[0]["total_likes"], 2)
+        self.assertEqual(get(author=self.user1.id).data[0]["total_likes"], 1)
+        self.assertEqual(get(author=user2.id, post=self.post1.id).data, [])
+        self.assertEqual(get(top=1).data,
+                         [{"post": post2.id, "total_likes": 2}])
+        self.assertEqual(get(top=5, author=self.user1.id).data,
+                         [{"post": self.post1.id, "total_likes": 1}])
+        self.assertEqual(get(top="x").status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_analytics_missing_params(self):
+        request = self.factory.get('/analytics')
+        force_authenticate(request, user=self.user1)
+        response = analytics(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_analytics_value_error(self):
         data = {
             'date_from': '123123',
@@ -194,7 +573,8 @@ class TestViews(TestCase):
         }
         request = self.factory.get('/analytics', data)
         force_authenticate(request, user=self.user1)
-        self.assertRaises(ValueError)
+        response = analytics(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
     def test_user_activity(self):
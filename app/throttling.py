@@ -0,0 +1,218 @@
+"""
+Throttles of the write routes. Token buckets per user and per
+client IP, with a separate budget for like toggles, and load
+shedding of writes while the database write lock is contended.
+
+Rates are "capacity/period" strings in
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]: a bucket holds up to
+capacity tokens, refilled evenly over the period, so clients may
+burst up to capacity and then sustain capacity per period.
+A request takes one token, or one per item for bulk likes.
+A scope without a rate is not throttled.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import db_write_wait
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    Returns (capacity, seconds) of a "capacity/period" rate,
+    period is one of second, minute, hour, day or their initial.
+    """
+    capacity, period = rate.split("/")
+    return int(capacity), PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Buckets in the memory of this process. A bucket that has
+    refilled reads the same as a missing one, so buckets are
+    dropped once full, the memory used follows active clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, updated, full_at), least recently used first
+        self._buckets = {}
+
+    def take(self, key, capacity, seconds, now, cost=1):
+        """
+        Takes cost tokens from bucket key if it has them.
+
+        Returns:
+        :return: seconds to wait for the tokens, 0 when taken
+        """
+        with self._lock:
+            tokens, updated, _ = self._buckets.pop(key, (capacity, now, now))
+            tokens, wait = _take(tokens, updated, capacity, seconds, now,
+                                 cost)
+            full_at = now + (capacity - tokens) * seconds / capacity
+            self._buckets[key] = (tokens, now, full_at)
+            # Stops at the first bucket still refilling, the ones
+            # behind it go on a later take
+            while self._buckets:
+                oldest = next(iter(self._buckets))
+                if self._buckets[oldest][2] > now:
+                    break
+                del self._buckets[oldest]
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in the Django cache, shared by all processes using it.
+    Reads and writes are not atomic, concurrent requests of one
+    client may take the same token, which only errs on allowing.
+    """
+
+    def take(self, key, capacity, seconds, now, cost=1):
+        key = f"throttle:{key}"
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens, wait = _take(tokens, updated, capacity, seconds, now, cost)
+        cache.set(key, (tokens, now), seconds)
+        return wait
+
+
+def _take(tokens, updated, capacity, seconds, now, cost):
+    tokens = min(capacity, tokens + (now - updated) * capacity / seconds)
+    # A request costing more than the bucket holds takes it whole
+    cost = min(cost, capacity)
+    if tokens >= cost:
+        return tokens - cost, 0
+    return tokens, (cost - tokens) * seconds / capacity
+
+
+local_store = LocalBucketStore()
+cache_store = CacheBucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles unsafe requests of a scope with a token bucket
+    per get_key(). The store is the process memory, or the Django
+    cache when THROTTLE_STORE is "cache".
+    """
+
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def get_cost(self, request):
+        """
+        Returns the number of tokens the request takes.
+        """
+        return 1
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if request.method in SAFE_METHODS:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        capacity, seconds = parse_rate(rate)
+        store = cache_store if settings.THROTTLE_STORE == "cache" \
+            else local_store
+        self.wait_seconds = store.take(
+            f"{self.scope}:{self.get_key(request)}", capacity, seconds,
+            time.time(), self.get_cost(request))
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    scope = "write"
+
+    def get_key(self, request):
+        return request.user.id
+
+
+class IPWriteThrottle(TokenBucketThrottle):
+    """
+    Per client IP, behind NUM_PROXIES proxies, so a client
+    cycling accounts is held too.
+    """
+
+    scope = "write_ip"
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class LikeThrottle(TokenBucketThrottle):
+    """
+    Like toggles have their own budget, they don't
+    use up the one of posting and editing.
+    """
+
+    scope = "like"
+
+    def get_key(self, request):
+        return request.user.id
+
+
+class BulkLikeThrottle(LikeThrottle):
+    """
+    Takes from the like budget a token per post toggled.
+    """
+
+    def get_cost(self, request):
+        # Malformed lists are answered 400 by the view
+        return len(request.data) if isinstance(request.data, list) else 1
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The service is overloaded, retry later."
+    default_code = "overloaded"
+
+    def __init__(self, wait):
+        super().__init__()
+        # Sent as Retry-After by the DRF exception handler
+        self.wait = wait
+
+
+class LoadShedThrottle(BaseThrottle):
+    """
+    Answers unsafe requests 503 at once while the moving average
+    of write statement durations (app.metrics.db_write_wait) is over
+    LOAD_SHED_WRITE_WAIT seconds, the longer the more of them,
+    up to all at twice the threshold. A write that would queue
+    behind the lock fails fast instead of holding a worker
+    and pushing up the latency of every other request.
+    LOAD_SHED_WRITE_WAIT = 0 disables it.
+    """
+
+    def allow_request(self, request, view):
+        threshold = settings.LOAD_SHED_WRITE_WAIT
+        if request.method in SAFE_METHODS or not threshold:
+            return True
+        excess = db_write_wait.value() / threshold - 1
+        if excess > 0 and random.random() < excess:
+            raise Overloaded(wait=1)
+        return True
+
+
+WRITE_THROTTLES = [LoadShedThrottle, IPWriteThrottle, UserWriteThrottle]
+LIKE_THROTTLES = [LoadShedThrottle, IPWriteThrottle, LikeThrottle]
+BULK_LIKE_THROTTLES = [LoadShedThrottle, IPWriteThrottle, BulkLikeThrottle]
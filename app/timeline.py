@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+from .models import Follow, Post, TimelineEntry
+from .pagination import KeysetPagination
+from .serializers import PostValuesSerializer
+
+# Position of a post in a timeline, ordered like Post.Meta.ordering
+Position = namedtuple("Position", ["date_published", "id"])
+
+
+class TimelineEntryPagination(KeysetPagination):
+    """
+    Keyset pagination over TimelineEntry, which is keyed
+    on (date_published, post_id) copied from the post.
+    """
+
+    id_field = "post_id"
+
+
+def timeline_page(paginator, user_id):
+    """
+    Returns a page of the home timeline of user_id
+    as PostValuesSerializer rows, newest first.
+
+    Posts pushed on write are read from TimelineEntry,
+    posts of followees with too many followers to fan out
+    (Follow.fanout False) are pulled from Post on read,
+    and both are merged on their (date_published, id) position.
+    Three queries per page whatever the size of the follow graph.
+
+    Args:
+    :param paginator: KeysetPagination of the request
+    :param user_id: id of timeline owner
+    """
+    limit = paginator.page_size + 1
+    entries = TimelineEntryPagination(paginator.request)
+    entries.page_size = paginator.page_size
+    pushed = entries.filter_queryset(
+        TimelineEntry.objects.filter(user_id=user_id)
+    ).values_list("date_published", "post_id")[:limit]
+    pulled_authors = Follow.objects.filter(
+        follower_id=user_id, fanout=False).values("followee_id")
+    pulled = paginator.filter_queryset(
+        Post.objects.filter(author_id__in=pulled_authors)
+    ).values_list("date_published", "id")[:limit]
+
+    # A set, as posts fanned out before the author crossed
+    # TIMELINE_FANOUT_LIMIT are both pushed and pulled
+    positions = sorted(
+        {Position(*row) for row in (*pushed, *pulled)}, reverse=True)
+    positions = paginator.paginate_rows(positions[:limit])
+    if not positions:
+        return []
+    ids = [position.id for position in positions]
+    posts = {
+        post.id: post
+        for post in PostValuesSerializer.values(
+            Post.objects.filter(id__in=ids))
+    }
+    # Posts deleted between the two reads are skipped
+    return [posts[position.id] for position in positions
+            if position.id in posts]
@@ -1,12 +1,28 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 
 urlpatterns = [
     path("account/register", views.registration, name="sign-up"),
     path("post/", views.post_collection, name="post-collection"),
+    path("post/bulk", views.post_bulk, name="post-bulk"),
+    path("post/bulk/like", views.post_bulk_like, name="post-bulk-like"),
+    path("post/export", views.post_export, name="post-export"),
     path("post/<int:id>", views.post_element, name="post-element"),
+    path("post/slug/<slug:slug>", views.post_by_slug, name="post-by-slug"),
     path("post/<int:id>/like", views.post_like, name="post-like"),
+    path("user/<int:id>/follow", views.user_follow, name="user-follow"),
+    path("timeline/", views.timeline, name="timeline"),
+    path("search/", views.post_search, name="post-search"),
     path("analytics/", views.analytics, name="analytics"),
     path("user-activity/", views.user_activity, name="user_activity"),
+    path("metrics/", views.metrics, name="metrics"),
+    # Async read routes for ASGI deployments, see app.async_views
+    path("async/post/", async_views.post_collection,
+         name="async-post-collection"),
+    path("async/post/<int:id>", async_views.post_element,
+         name="async-post-element"),
+    path("async/analytics/", async_views.analytics, name="async-analytics"),
+    path("async/user-activity/", async_views.user_activity,
+         name="async-user-activity"),
 ]
@@ -1,21 +1,64 @@
-from django.http import HttpResponse
-from datetime import datetime
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from datetime import datetime, time, timedelta
 
 from rest_framework.decorators import (
-    api_view, permission_classes,)
+    api_view, permission_classes, renderer_classes, throttle_classes)
 from rest_framework import status
 from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Post, Like
-from .serializers import PostSerializer, LikeSerializer, UserCreateSerializer
-from django.db.models import Count
+from . import activity
+from .authentication import ensure_user_exists
+from .cache import (
+    MISSING, get_analytics, invalidate_post, load_post_payload,
+    peek_post_payload)
+from .conditional import (
+    has_conditional_headers, not_modified, page_validators,
+    post_validators, set_validators, user_validators)
+from .models import Post, Like, LikeStat, PostLikeStat, Follow
+from .metrics import render as render_metrics, timed_serialization
+from .pagination import KeysetPagination, OffsetPagination
+from .renderers import NDJSONRenderer
+from .serializers import (
+    PostSerializer, LikeSerializer, UserCreateSerializer, PostNDJSONEncoder,
+    PostValuesSerializer, FollowSerializer, PostBulkItemSerializer,
+    AuthorSummarySerializer, PostAuthorValuesSerializer)
+from .search import get_backend as get_search_backend, parse_query
+from .throttling import (
+    BULK_LIKE_THROTTLES, LIKE_THROTTLES, WRITE_THROTTLES)
+from .timeline import timeline_page
 from django.contrib.auth.models import User
-from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
 
 # Create your views here.
 
+# Rows fetched per round trip by the streaming export
+EXPORT_CHUNK_SIZE = 2000
+
+# Most items accepted by one bulk request
+BULK_MAX_ITEMS = 500
+
+# Relations posts can embed with ?expand=
+EXPANDABLE = {"author"}
+
+# Names of the analytics granularity param
+ANALYTICS_GRANULARITIES = {
+    "hour": LikeStat.HOUR,
+    "day": LikeStat.DAY,
+    "week": LikeStat.WEEK,
+    "month": LikeStat.MONTH,
+}
+# Most posts returned by analytics with top
+ANALYTICS_MAX_TOP = 100
+
 
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])
@@ -54,13 +97,22 @@ def registration(request):
 
 
 @api_view(["GET", "POST"])
+@throttle_classes(WRITE_THROTTLES)
 def post_collection(request):
     """
     Route for multiple Post objects - GET method
     or POST method for new Post object creation.
+    GET is paginated with an opaque cursor, the next page url
+    is returned in the Link header (see app.pagination).
+    GET answers 304 to matching If-None-Match / If-Modified-Since,
+    checked on the (id, updated_at) pairs of the page only.
+    Example url: /api/post/?page_size=20&cursor=MjAyMS0wMi0xNVQx...
 
     Args:
     :param request: request parameter from API
+    :query_params: cursor and page_size. Optional
+    expand=author embeds AuthorSummarySerializer data as "author",
+    read with a join in the same single query
 
     Returns:
     :return: serialized data of Post object or status code
@@ -71,15 +123,22 @@ def post_collection(request):
                     "post": "IT IS POSSIBLE that John Pringle’s...",
                     "slug": "admin-lesna-why-trusting-the-science-is-complicated",
                     "date_published": "2021-02-15T10:47:55.652257Z",
-                    "author": 1
+                    "like_count": 0,
+                    "updated_at": "2021-02-15T10:47:55.652257Z",
+                    "author": 1,
+                    "liked_by_me": false
                 }
             ]
     """
 
     if request.method == "GET":
-        posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPagination(request)
+        response, data, validators = _post_page(request, paginator)
+        if response is not None:
+            return response
+        response = paginator.get_paginated_response(
+            data, status=status.HTTP_200_OK)
+        return set_validators(response, *validators)
     else:
         data = {
             "author": request.user.id,
@@ -93,14 +152,154 @@ def post_collection(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _post_page(request, paginator):
+    """
+    Database part of post_collection GET, shared with
+    the async view. Returns (response, data, validators),
+    response is a 304 when the client's copy is fresh.
+    liked_by_me of the whole page comes from one query.
+    """
+    expand = _expand(paginator.request.query_params)
+    user_id = request.user.id
+    queryset = Post.objects.all()
+    if has_conditional_headers(request):
+        rows = list(
+            paginator.filter_queryset(queryset)
+            .values_list("id", "updated_at")[: paginator.page_size + 1]
+        )
+        validators = user_validators(page_validators(
+            rows[: paginator.page_size], len(rows) > paginator.page_size),
+            user_id)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response, None, validators
+
+    serializer_class = PostValuesSerializer
+    if "author" in expand:
+        serializer_class = PostAuthorValuesSerializer
+    posts = paginator.paginate_queryset(serializer_class.values(queryset))
+    liked = _liked_by(user_id, [post.id for post in posts])
+    with timed_serialization():
+        data = serializer_class(posts, many=True).data
+        for item in data:
+            item["liked_by_me"] = item["id"] in liked
+    # A like toggle moves updated_at, so liked_by_me is covered too
+    validators = user_validators(page_validators(
+        [(post.id, post.updated_at) for post in posts],
+        paginator.next_position is not None), user_id)
+    return None, data, validators
+
+
+def _liked_by(user_id, ids, using=None):
+    """
+    Returns the set of ids of the posts user_id likes,
+    among ids, with a single IN query on database 'using',
+    the routed one by default.
+    """
+    if not ids:
+        return set()
+    return set(Like.objects.using(using).filter(
+        user_id=user_id, post_id__in=ids, liked=True,
+    ).values_list("post_id", flat=True))
+
+
+def _expand(query_params):
+    """
+    Returns the set of relations the comma separated
+    ?expand= param asks to embed.
+
+    Raises:
+    ValidationError: when a relation is not in EXPANDABLE
+    """
+    names = {name for name in query_params.get("expand", "").split(",")
+             if name}
+    unknown = names - EXPANDABLE
+    if unknown:
+        raise ValidationError({
+            "expand": f"Unknown relation {', '.join(sorted(unknown))}, "
+                      f"expected one of {', '.join(sorted(EXPANDABLE))}."})
+    return names
+
+
+@api_view(["POST"])
+@throttle_classes(WRITE_THROTTLES)
+def post_bulk(request):
+    """
+    Route for creation of many Post objects in one request,
+    with one bulk INSERT in a single transaction.
+    All items are validated together, if any is invalid
+    nothing is created and the errors are returned per item,
+    in the order of the request.
+
+    Args:
+    :param request: request parameter from API
+    Required: list of up to BULK_MAX_ITEMS {"title", "post"} objects
+
+    Returns:
+    :return: serialized data of created Post objects or per item errors
+    Example: [{}, {"title": ["This field may not be blank."]}]
+    """
+    if not isinstance(request.data, list) or not (
+            0 < len(request.data) <= BULK_MAX_ITEMS):
+        return Response(
+            {"detail": f"Expected a list of 1 to {BULK_MAX_ITEMS} posts."},
+            status=status.HTTP_400_BAD_REQUEST)
+    serializer = PostBulkItemSerializer(data=request.data, many=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    posts = Post.publish_many(
+        request.user.id, request.user.username, serializer.validated_data)
+    data = PostSerializer(posts, many=True).data
+    return Response(data, status=status.HTTP_201_CREATED)
+
+
+@api_view(["GET"])
+@renderer_classes([NDJSONRenderer, JSONRenderer])
+def post_export(request):
+    """
+    Route for bulk export of all Post objects as NDJSON stream,
+    one post per line, for the search indexer and data dumps.
+    Rows are read with a chunked server-side iterator
+    and written as they are fetched, so memory use and
+    time to first byte don't depend on the table size.
+
+    Args:
+    :param request: request parameter from API
+
+    Returns:
+    :return: streaming response with application/x-ndjson content
+    Example: {"id":3,"title":"Faster JavaScript Calls",...,"author":4}
+             {"id":2,"title":"Why “Trusting the Science” Is...","author":1}
+    """
+    encoder = PostNDJSONEncoder()
+    rows = (
+        Post.objects.order_by("-date_published", "-id")
+        .values_list(*encoder.fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return StreamingHttpResponse(
+        encoder.iter_chunks(rows),
+        content_type=NDJSONRenderer.media_type,
+        status=status.HTTP_200_OK,
+    )
+
+
 @api_view(["GET", "PUT", "DELETE"])
+@throttle_classes(WRITE_THROTTLES)
 def post_element(request, id):
     """
     Route for singular post object with methods GET, PUT, DELETE.
+    GET is served through a read-through cache (see app.cache),
+    the X-Cache response header tells HIT or MISS.
+    GET answers 304 to matching If-None-Match / If-Modified-Since,
+    from the cached validators or the post's updated_at alone.
 
     Args:
     :param request: request parameter from API
     :param id: id of post object. Required
+    :query_params: expand=author on GET, as for post_collection,
+    the author is cached along with the post
 
     Raises:
     Post.DoesNotExist: when target object is not found
@@ -113,39 +312,147 @@ def post_element(request, id):
                 "post": "By putting the number of arguments...",
                 "slug": "tokio-faster-javascript-calls",
                 "date_published": "2021-02-15T20:12:48.573997Z",
-                "author": 4
+                "like_count": 1,
+                "updated_at": "2021-02-16T08:38:30.946808Z",
+                "author": 4,
+                "liked_by_me": true
             }
     """
+    if request.method == "GET":
+        return _get_post(request, id)
+
     try:
         post = Post.objects.get(id=id)
     except Post.DoesNotExist:
         return HttpResponse(status=404)
 
-    if request.method == "GET":
-        serializer = PostSerializer(post)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    elif request.method == "PUT":
+    if request.method == "PUT":
         # TODO make only one field update necessary
         serializer = PostSerializer(post, data=request.data)
         if serializer.is_valid():
             serializer.save()
+            invalidate_post(id)
             return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == "DELETE":
         post.delete()
+        invalidate_post(id)
         # TODO add comment when deleted
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(["GET"])
+def post_by_slug(request, slug):
+    """
+    Route for singular post object looked up by its slug,
+    answered like post_element GET. The slug is resolved
+    with the unique index of Post.slug.
+
+    Args:
+    :param request: request parameter from API
+    :param slug: slug of post object. Required
+
+    Raises:
+    Post.DoesNotExist: when target object is not found
+
+    Returns:
+    :return: serialized data of Post object or status code
+    """
+    id = Post.objects.filter(slug=slug).values_list("id", flat=True).first()
+    if id is None:
+        return HttpResponse(status=404)
+    return _get_post(request, id)
+
+
+def _get_post(request, id):
+    """
+    GET of post_element, served from the read-through cache
+    with conditional GET support.
+    """
+    response, payload, cache_status = _fetch_post(request, id)
+    if response is None:
+        response = Response(payload["data"], status=status.HTTP_200_OK)
+        set_validators(response, payload["etag"], payload["last_modified"])
+    response["X-Cache"] = cache_status
+    return response
+
+
+def _fetch_post(request, id):
+    """
+    Cache and database part of _get_post, shared with
+    the async view. Returns (response, payload, cache_status),
+    response is a 304 or 404 when there is no body to send.
+    The cached payload is shared by all users, liked_by_me
+    is looked up per request.
+    """
+    expand = _expand(request.GET)
+    user_id = request.user.id
+    payload = peek_post_payload(id)
+    cache_status = "HIT" if payload is not None else "MISS"
+    if payload == MISSING:
+        return HttpResponse(status=404), None, cache_status
+    if payload is None and has_conditional_headers(request):
+        updated_at = Post.objects.filter(id=id).values_list(
+            "updated_at", flat=True).first()
+        if updated_at is not None:
+            response = not_modified(request, *user_validators(
+                post_validators(id, updated_at), user_id))
+            if response is not None:
+                return response, None, cache_status
+    if payload is None:
+        payload = load_post_payload(id, lambda: _load_post_payload(id))
+    if payload is None:
+        return HttpResponse(status=404), None, cache_status
+
+    etag, last_modified = user_validators(
+        (payload["etag"], payload["last_modified"]), user_id)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response, payload, cache_status
+    # From the primary like the validators, a lagging replica
+    # would pin a stale value behind the new ETag
+    liked = _liked_by(user_id, [id], using=DEFAULT_DB_ALIAS)
+    data = dict(payload["data"], liked_by_me=bool(liked))
+    if "author" in expand:
+        data["author"] = payload["author"]
+    payload = {**payload, "data": data, "etag": etag}
+    return response, payload, cache_status
+
+
+def _load_post_payload(id):
+    """
+    Cache loader of post_element GET, returns serialized
+    Post object and author summary with its validators
+    or None when it doesn't exist. The author is read
+    with the same query, and cached along with the post.
+    """
+    # Always the primary, a lagging replica would be cached
+    post = Post.objects.using(DEFAULT_DB_ALIAS).select_related(
+        "author").only(*PostAuthorValuesSerializer.fields).filter(
+        id=id).first()
+    if post is None:
+        return None
+    etag, last_modified = post_validators(post.id, post.updated_at)
+    with timed_serialization():
+        data = dict(PostSerializer(post).data)
+        author = dict(AuthorSummarySerializer(post.author).data)
+    return {
+        "data": data,
+        "author": author,
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+
+
 @api_view(["PUT"])
+@throttle_classes(LIKE_THROTTLES)
 def post_like(request, id):
     """
     Route for post like and post unlike.
-    Triggers like_unlike() method of Like model,
-    switching Boolean to opposite value.
-    If Like object doesn't exist, creates it.
+    Triggers Like.toggle(), which switches Boolean to opposite
+    value with one conditional UPDATE in a single transaction.
+    If Like object doesn't exist, creates it liked.
 
     Args:
     :param request: request parameter from API
@@ -165,50 +472,210 @@ def post_like(request, id):
             }
     """
     try:
-        post = Post.objects.get(id=id)
+        like, created = Like.toggle(request.user.id, id)
     except Post.DoesNotExist:
         return HttpResponse(status=404)
+    except IntegrityError:
+        ensure_user_exists(request.user.id)
+        raise
+
+    serializer = LikeSerializer(like)
+    if created:
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["PUT"])
+@throttle_classes(BULK_LIKE_THROTTLES)
+def post_bulk_like(request):
+    """
+    Route for like / unlike of many posts in one request,
+    Like.toggle_many() toggles all of them in a single transaction.
+    Results are returned per item, in the order of the request,
+    with the status post_like would have answered.
+
+    Args:
+    :param request: request parameter from API
+    Required: list of up to BULK_MAX_ITEMS distinct post ids
+
+    Returns:
+    :return: per item status and serialized data of Like object
+    Example: [
+                {
+                    "post": 3,
+                    "status": 201,
+                    "like": {
+                        "id": 2,
+                        "date": "2021-02-16T08:38:30.946808Z",
+                        "liked": true,
+                        "user": 4,
+                        "post": 3
+                    }
+                },
+                {"post": 9, "status": 404, "like": null}
+            ]
+    """
+    post_ids = request.data
+    if (not isinstance(post_ids, list)
+            or not 0 < len(post_ids) <= BULK_MAX_ITEMS
+            or not all(type(id) is int for id in post_ids)
+            or len(set(post_ids)) != len(post_ids)):
+        return Response(
+            {"detail": f"Expected a list of 1 to {BULK_MAX_ITEMS} "
+                       "distinct post ids."},
+            status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        like = Like.objects.get(post=post)
-    except Like.DoesNotExist:
-        data = {
-            "user": request.user.id,
+        toggled = Like.toggle_many(request.user.id, post_ids)
+    except IntegrityError:
+        ensure_user_exists(request.user.id)
+        raise
+    results = []
+    for id in post_ids:
+        if id not in toggled:
+            results.append(
+                {"post": id, "status": status.HTTP_404_NOT_FOUND,
+                 "like": None})
+            continue
+        like, created = toggled[id]
+        results.append({
             "post": id,
-        }
-        serializer = LikeSerializer(data=data)
-        if serializer.is_valid():
-            serializer.save()
+            "status": (status.HTTP_201_CREATED if created
+                       else status.HTTP_202_ACCEPTED),
+            "like": LikeSerializer(like).data,
+        })
+    return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(["PUT", "DELETE"])
+@throttle_classes(WRITE_THROTTLES)
+def user_follow(request, id):
+    """
+    Route for following (PUT) and unfollowing (DELETE) a user.
+    Following backfills the home timeline with the user's
+    latest posts, unfollowing removes them from it.
+
+    Args:
+    :param request: request parameter from API
+    :param id: id of followed user. Required
+
+    Raises:
+    User.DoesNotExist: when followed user is not found
+
+    Returns:
+    :return: serialized data of Follow object or status code
+    Example: {
+                "id": 1,
+                "fanout": true,
+                "date": "2021-02-16T08:38:30.946808Z",
+                "follower": 4,
+                "followee": 1
+            }
+    """
+    if id == request.user.id:
+        return Response({"detail": "Users can't follow themselves."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == "PUT":
+        try:
+            follow, created = Follow.follow(request.user.id, id)
+        except User.DoesNotExist:
+            return HttpResponse(status=404)
+        except IntegrityError:
+            ensure_user_exists(request.user.id)
+            raise
+        serializer = FollowSerializer(follow)
+        if created:
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-    else:
-        like.like_unlike()
-        data = {
-            "user": request.user.id,
-            "post": id,
-        }
-        serializer = LikeSerializer(like, data=data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not Follow.unfollow(request.user.id, id):
+        return HttpResponse(status=404)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET"])
+def timeline(request):
+    """
+    Home timeline route: posts of the user and of followed users,
+    newest first. Cursor paginated like post_collection GET.
+    Example url: /api/timeline/?page_size=20&cursor=MjAyMS0wMi0xNVQx...
+
+    Args:
+    :param request: request parameter from API
+    :query_params: cursor and page_size. Optional
+
+    Returns:
+    :return: serialized data of Post objects, as post_collection GET
+    """
+    paginator = KeysetPagination(request)
+    posts = timeline_page(paginator, request.user.id)
+    with timed_serialization():
+        data = PostValuesSerializer(posts, many=True).data
+    return paginator.get_paginated_response(data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def post_search(request):
+    """
+    Full-text search route over post titles and texts,
+    best ranked first, title matches weigh more (see app.search).
+    All terms must match, the last one as a prefix.
+    Page number paginated, the next page url is returned
+    in the Link header.
+    Example url: /api/search/?q=trusting+scien&page=2&page_size=20
+
+    Args:
+    :param request: request parameter from API
+    :query_params: q. Required. page and page_size. Optional
+
+    Returns:
+    :return: serialized data of Post objects, as post_collection GET
+    """
+    terms = parse_query(request.query_params.get("q", ""))
+    if not terms:
+        return Response({"q": "Expected at least one search term."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    paginator = OffsetPagination(request)
+    ids = paginator.paginate_rows(get_search_backend().search(
+        terms, paginator.offset, paginator.page_size + 1))
+    posts = {
+        post.id: post
+        for post in PostValuesSerializer.values(
+            Post.objects.filter(id__in=ids))
+    } if ids else {}
+    with timed_serialization():
+        data = PostValuesSerializer(
+            [posts[id] for id in ids if id in posts], many=True).data
+    return paginator.get_paginated_response(data, status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
 def analytics(request):
     """
-    Analytics route displaying quantity of likes received by day.
+    Analytics route displaying quantity of likes received
+    by hour, day, week or month, overall or for a post or an author,
+    or the posts with the most likes of the window.
+    Served from the LikeStat and PostLikeStat rollups, so only
+    the rows of the requested periods are read, and results are
+    cached until a like lands in their window.
     Example url: /api/analytics/?date_from=2020-02-02&date_to=2020-02-15.
 
     Args:
     :param request: request parameter from API
     :query_params: date_from and date_to. Required
+    granularity: hour, day (default), week or month
+    post: id of a post, author: id of a user
+    top: number of posts to return instead of periods, at most
+    ANALYTICS_MAX_TOP
 
     Raises:
     ValueError: when date_from or date_to query params are not in Date format
+    KeyError: when date_from or date_to query params are missing
 
     Returns:
-    :return: API should return analytics aggregated by day.
+    :return: API should return analytics aggregated by period,
+    each with its first day (and "hour" by hour).
     Example: [  {
                     "day": 15,
                     "month": 2,
@@ -221,28 +688,123 @@ def analytics(request):
                     "year": 2021,
                     "total_likes": 1
                 }]
+    With top: [{"post": 3, "total_likes": 12}, ...]
     """
 
+    return Response(*_analytics(request.query_params))
+
+
+def _analytics(query_params):
+    """
+    Body of analytics, shared with the async view.
+    Returns (data, status).
+    """
     try:
-        date_from = request.query_params["date_from"]
-        date_to = request.query_params["date_to"]
-        date_from_converted = datetime.fromisoformat(date_from)
-        date_to_converted = datetime.fromisoformat(date_to)
+        date_from = query_params["date_from"]
+        date_to = query_params["date_to"]
+        date_from_converted = datetime.fromisoformat(date_from).date()
+        date_to_converted = datetime.fromisoformat(date_to).date()
+    except KeyError:
+        return (
+            "date_from and date_to parameters are required",
+            status.HTTP_400_BAD_REQUEST,
+        )
     except ValueError:
-        return f"date_from ({date_from}) or date_to ({date_to}) " \
-            f"parameters are not in format Y-m-d"
+        return (
+            f"date_from ({date_from}) or date_to ({date_to}) "
+            f"parameters are not in format Y-m-d",
+            status.HTTP_400_BAD_REQUEST,
+        )
 
-    else:
-        query = (
-            Like.objects.filter(liked=True)
-            .annotate(day=ExtractDay("date"))
-            .annotate(month=ExtractMonth("date"))
-            .annotate(year=ExtractYear("date"))
-            .values("day", "month", "year")
-            .annotate(total_likes=Count("liked"))
+    granularity = ANALYTICS_GRANULARITIES.get(
+        query_params.get("granularity", "day"))
+    if granularity is None:
+        return (
+            "granularity must be one of "
+            + ", ".join(ANALYTICS_GRANULARITIES),
+            status.HTTP_400_BAD_REQUEST,
         )
+    filters = {}
+    for name in ("post", "author", "top"):
+        value = query_params.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = int(value)
+        except ValueError:
+            filters[name] = 0
+        if filters[name] < 1:
+            return (f"{name} must be a positive integer",
+                    status.HTTP_400_BAD_REQUEST)
+    if "top" in filters:
+        filters["top"] = min(filters["top"], ANALYTICS_MAX_TOP)
+
+    start = LikeStat.period_start(date_from_converted, granularity)
+    end = timezone.make_aware(
+        datetime.combine(date_to_converted + timedelta(days=1), time()))
+    params = "|".join(
+        [granularity, date_from_converted.isoformat(),
+         date_to_converted.isoformat()]
+        + [f"{name}={value}" for name, value in sorted(filters.items())])
+    data, _ = get_analytics(
+        params, _months(timezone.localtime(start), date_to_converted),
+        lambda: _load_analytics(granularity, start, end, filters))
+    return data, status.HTTP_200_OK
+
+
+def _months(first, last):
+    """
+    Returns (year, month) pairs from the month of 'first'
+    to the month of 'last', both included.
+    """
+    year, month = first.year, first.month
+    months = []
+    while (year, month) <= (last.year, last.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
 
-        return Response(query, status=status.HTTP_200_OK)
+def _load_analytics(granularity, start, end, filters):
+    """
+    Reads analytics rows of periods starting in [start, end)
+    from the rollups, see _analytics().
+    """
+    if filters:
+        stats = PostLikeStat.objects.filter(
+            granularity=granularity, period__gte=start, period__lt=end)
+        if "post" in filters:
+            stats = stats.filter(post_id=filters["post"])
+        if "author" in filters:
+            stats = stats.filter(post__author_id=filters["author"])
+        if "top" in filters:
+            query = stats.values("post").annotate(
+                total=Sum("total_likes")).filter(total__gt=0).order_by(
+                "-total", "post")[:filters["top"]]
+            return [{"post": row["post"], "total_likes": row["total"]}
+                    for row in query]
+        query = stats.values("period").annotate(
+            total=Sum("total_likes")).filter(total__gt=0).order_by(
+            "period").values_list("period", "total")
+    else:
+        query = LikeStat.objects.filter(
+            granularity=granularity, period__gte=start, period__lt=end,
+            total_likes__gt=0,
+        ).values_list("period", "total_likes")
+
+    data = []
+    for period, total_likes in query:
+        period = timezone.localtime(period)
+        row = {
+            "day": period.day,
+            "month": period.month,
+            "year": period.year,
+            "total_likes": total_likes,
+        }
+        if granularity == LikeStat.HOUR:
+            row["hour"] = period.hour
+        data.append(row)
+    return data
 
 
 @api_view(["GET"])
@@ -250,34 +812,78 @@ def user_activity(request):
     """
     user activity an endpoint, which will show when user was
     logged in last time and when he made a last request to the service.
-
-    Raises:
-    Object.DoesNotExist: when target object is not found
+    Everything comes from one query on indexed columns,
+    last_request prefers the not yet flushed app.activity buffer.
 
     Args:
     :param request parameter from API
 
     Returns:
-    :return: dict with last_login, last_like and last_post
-    parameters and datetime values
+    :return: dict with last_login, last_like, last_post and
+    last_request parameters and datetime values or None
 
     Example:
     {
         "last_login": "2021-02-16T08:03:56.779157Z",
         "last_like": "2021-02-16T08:04:40.912497Z",
-        "last_post": "2021-02-15T20:12:48.573997Z"
+        "last_post": "2021-02-15T20:12:48.573997Z",
+        "last_request": "2021-02-16T08:05:02.118904Z"
     }
 
     """
 
-    user = User.objects.get(id=request.user.id)
-    last_login = user.last_login
-    last_like = Like.objects.filter(user=request.user).last()
-    last_post = Post.objects.filter(author=request.user).last()
-
-    data = {
-        "last_login": last_login,
-        "last_like": last_like.date,
-        "last_post": last_post.date_published,
-    }
+    data = _user_activity(request.user.id)
+    if data is None:
+        return HttpResponse(status=404)
     return Response(data, status=status.HTTP_200_OK)
+
+
+def _user_activity(user_id):
+    """
+    Query of user_activity, shared with the async view.
+    Returns None when the user doesn't exist.
+    """
+    last_like = Like.objects.filter(user=OuterRef("pk")).order_by("-date")
+    last_post = Post.objects.filter(author=OuterRef("pk")).order_by(
+        "-date_published")
+    data = (
+        User.objects.filter(id=user_id)
+        .annotate(
+            last_like=Subquery(last_like.values("date")[:1]),
+            last_post=Subquery(last_post.values("date_published")[:1]),
+            last_request=F("activity__last_request"),
+        )
+        .values("last_login", "last_like", "last_post", "last_request")
+        .first()
+    )
+    if data is not None:
+        data["last_request"] = (
+            activity.pending_last_request(user_id) or data["last_request"]
+        )
+    return data
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint with per route request metrics
+    of this process, see app.metrics and app.middleware.
+    Plain Django view, so scrapers need no JWT. With
+    METRICS_TOKEN set, only requests bearing it are answered,
+    otherwise only clients from INTERNAL_IPS.
+
+    Args:
+    :param request: request parameter
+
+    Returns:
+    :return: metrics in Prometheus text format or 403 status code
+    """
+    if settings.METRICS_TOKEN:
+        allowed = hmac.compare_digest(
+            request.META.get("HTTP_AUTHORIZATION", ""),
+            f"Bearer {settings.METRICS_TOKEN}")
+    else:
+        allowed = request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(),
+                        content_type="text/plain; version=0.0.4")
@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for the social_net API.
+
+Every benchmark runs against a throwaway test database,
+so it never touches db.sqlite3. Run from the project root, e.g.:
+
+    python -m benchmarks.pagination --sizes 10000 100000 1000000
+"""
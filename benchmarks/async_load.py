@@ -0,0 +1,112 @@
+"""
+Load test of the read routes under the sync (WSGI, fixed thread pool
+like gunicorn --threads) and async (ASGI, app.async_views) setups:
+requests per second and latency at growing client concurrency.
+
+    python -m benchmarks.async_load --concurrency 1 16 64 256
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import utils
+
+ROUTES = ("post/?page_size=20", "analytics/?date_from=2020-01-01"
+          "&date_to=2040-01-01", "user-activity/")
+
+
+def sync_load(url, token, concurrency, requests, threads):
+    """
+    concurrency clients share a pool of threads WSGI workers,
+    every request is timed from the moment its client sends it.
+    """
+    from django.db import connection
+    from django.test import Client
+
+    def call(sent):
+        try:
+            Client().get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        finally:
+            connection.close()
+        return time.perf_counter() - sent
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        started = time.perf_counter()
+        samples = []
+        for offset in range(0, requests, concurrency):
+            batch = [pool.submit(call, time.perf_counter())
+                     for _ in range(min(concurrency, requests - offset))]
+            samples += [future.result() for future in batch]
+    return time.perf_counter() - started, samples
+
+
+def async_load(url, token, concurrency, requests):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+
+    async def call():
+        sent = time.perf_counter()
+        await client.get(url, authorization=f"Bearer {token}")
+        return time.perf_counter() - sent
+
+    async def main():
+        started = time.perf_counter()
+        samples = []
+        for offset in range(0, requests, concurrency):
+            samples += await asyncio.gather(
+                *[call() for _ in range(min(concurrency,
+                                            requests - offset))])
+        return time.perf_counter() - started, samples
+
+    return asyncio.run(main())
+
+
+def run(concurrencies, requests, threads):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from app import tasks
+    from app.models import Like, Post
+
+    users = utils.seed_users(50)
+    utils.seed_posts(10_000, users)
+    for post_id in Post.objects.values_list("id", flat=True)[:500]:
+        Like.toggle(users[post_id % 50].id, post_id)
+    tasks.run_pending()
+    token = str(RefreshToken.for_user(users[0]).access_token)
+
+    print(f"{'route':>16} {'clients':>8} {'setup':>6} {'req/s':>8} "
+          f"{'p50':>9} {'p99':>9}")
+    for route in ROUTES:
+        for concurrency in concurrencies:
+            for setup, load in (
+                    ("sync", lambda: sync_load(
+                        f"/api/{route}", token, concurrency, requests,
+                        threads)),
+                    ("async", lambda: async_load(
+                        f"/api/async/{route}", token, concurrency,
+                        requests))):
+                seconds, samples = load()
+                stats = utils.summarize([s * 1000 for s in samples])
+                print(f"{route.split('?')[0]:>16} {concurrency:>8} "
+                      f"{setup:>6} {len(samples) / seconds:>8.0f} "
+                      f"{stats['p50']:>7.1f}ms {stats['p99']:>7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8,
+                        help="WSGI worker threads of the sync setup")
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.concurrency, args.requests, args.threads)
+
+
+if __name__ == "__main__":
+    main()
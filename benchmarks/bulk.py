@@ -0,0 +1,84 @@
+"""
+Objects per second of post creation and like toggles through
+the single item endpoints called in a loop against the
+post/bulk and post/bulk/like endpoints.
+
+    python -m benchmarks.bulk --items 500
+"""
+import argparse
+import json
+import time
+
+from benchmarks import utils
+
+
+def run(items, followers):
+    from django.test import RequestFactory
+    from rest_framework.test import force_authenticate
+
+    from app.models import Follow
+    from app.views import post_bulk, post_bulk_like, post_collection, \
+        post_like
+
+    factory = RequestFactory()
+    author, *others = utils.seed_users(followers + 1)
+    for user in others:
+        Follow.follow(user.id, author.id)
+
+    def call(view, method, url, data, *args):
+        request = getattr(factory, method)(
+            url, json.dumps(data), content_type="application/json")
+        force_authenticate(request, user=author)
+        response = view(request, *args)
+        assert response.status_code < 300, response.data
+        return response
+
+    def timed(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    def posts(prefix):
+        return [{"title": f"{prefix} {i}", "post": "Lorem ipsum. " * 8}
+                for i in range(items)]
+
+    ids = []
+
+    def single_posts():
+        for item in posts("Single"):
+            ids.append(call(post_collection, "post", "/api/post/",
+                            item).data["id"])
+
+    def single_likes():
+        for id in ids:
+            call(post_like, "put", f"/api/post/{id}/like", {}, id)
+
+    def bulk_posts():
+        ids[:] = [post["id"] for post in call(
+            post_bulk, "post", "/api/post/bulk", posts("Bulk")).data]
+
+    def bulk_likes():
+        call(post_bulk_like, "put", "/api/post/bulk/like", ids)
+
+    print(f"{'flow':>8} {'posts/s':>10} {'likes/s':>10}")
+    for name, create, like in (("single", single_posts, single_likes),
+                               ("bulk", bulk_posts, bulk_likes)):
+        post_seconds = timed(create)
+        like_seconds = timed(like)
+        print(f"{name:>8} {items / post_seconds:>10.0f} "
+              f"{items / like_seconds:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--followers", type=int, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.items, args.followers)
+
+
+if __name__ == "__main__":
+    main()
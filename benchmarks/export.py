@@ -0,0 +1,57 @@
+"""
+Time to first byte, total time and peak Python memory
+of the NDJSON post export at growing table sizes.
+
+    python -m benchmarks.export --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import utils
+
+
+def run(sizes):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from app.models import Post
+    from app.views import post_export
+
+    factory = APIRequestFactory()
+    authors = utils.seed_users(50)
+    user = User.objects.first()
+
+    print(f"{'posts':>9} {'ttfb':>10} {'total':>10} {'peak mem':>10}")
+    for size in sorted(sizes):
+        utils.seed_posts(size - Post.objects.count(), authors)
+        request = factory.get("/api/post/export")
+        force_authenticate(request, user=user)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        chunks = iter(post_export(request).streaming_content)
+        next(chunks)
+        ttfb = time.perf_counter() - started
+        for _ in chunks:
+            pass
+        total = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{size:>9} {ttfb * 1000:>8.2f}ms {total:>9.2f}s "
+              f"{peak / 2 ** 20:>8.2f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Toggles per second of concurrent likes on one post:
+the previous SELECT + serializer save flow against Like.toggle(),
+and Like.toggle() without its LikeEvent insert, the price of the log.
+
+    python -m benchmarks.like_toggle --threads 8 --toggles 200
+"""
+import argparse
+import contextlib
+import threading
+import time
+from unittest import mock
+
+from benchmarks import utils
+
+
+def legacy_toggle(user_id, post_id):
+    """
+    The flow post_like used before Like.toggle():
+    separate SELECTs, flip in Python, save through LikeSerializer.
+    """
+    from app.models import Like, Post
+    from app.serializers import LikeSerializer
+
+    post = Post.objects.get(id=post_id)
+    data = {"user": user_id, "post": post.id}
+    try:
+        like = Like.objects.get(user_id=user_id, post=post)
+    except Like.DoesNotExist:
+        serializer = LikeSerializer(data=data)
+    else:
+        like.like_unlike()
+        serializer = LikeSerializer(like, data=data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def upsert_toggle(user_id, post_id):
+    from app.models import Like
+
+    Like.toggle(user_id, post_id)
+
+
+def hammer(toggle, users, post_id, toggles):
+    """
+    Runs toggles per user, one thread per entry of users,
+    all on one post. Returns (seconds, errors).
+    """
+    from django.db import connection
+
+    errors = []
+
+    def worker(user_id):
+        try:
+            for _ in range(toggles):
+                try:
+                    toggle(user_id, post_id)
+                except Exception as error:
+                    errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(user.id,))
+               for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+
+def run(threads, toggles):
+    """
+    Each flow runs twice: every thread with its own user,
+    then all threads clicking as one user, where the final
+    'liked' must match the parity of all toggles.
+    """
+    from app.models import Like, LikeEvent, Post
+
+    users = utils.seed_users(threads)
+    total = threads * toggles
+    print(f"{'flow':>8} {'users':>9} {'toggles/s':>10} {'errors':>7} "
+          f"{'state ok':>9}")
+    for name, toggle, unlogged in (("legacy", legacy_toggle, False),
+                                   ("upsert", upsert_toggle, False),
+                                   ("no log", upsert_toggle, True)):
+        for scenario, clickers in (("distinct", users),
+                                   ("shared", users[:1] * threads)):
+            utils.seed_posts(1, users)
+            post = Post.objects.first()
+            with mock.patch.object(LikeEvent.objects, "create") \
+                    if unlogged else contextlib.nullcontext():
+                seconds, errors = hammer(toggle, clickers, post.id, toggles)
+            likes = Like.objects.filter(post=post)
+            per_user = total // len(set(clickers))
+            state_ok = (
+                likes.count() == len(set(clickers))
+                and all(like.liked == (per_user % 2 == 1) for like in likes)
+            )
+            print(f"{name:>8} {scenario:>9} "
+                  f"{(total - len(errors)) / seconds:>10.1f} "
+                  f"{len(errors):>7} {str(state_ok):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--toggles", type=int, default=200)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.threads, args.toggles)
+
+
+if __name__ == "__main__":
+    main()
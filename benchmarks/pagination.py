@@ -0,0 +1,70 @@
+"""
+Latency of post_collection pages at growing table sizes and scroll depths.
+
+Keyset pages should stay flat across sizes and depths,
+OFFSET pages are measured alongside for comparison.
+
+    python -m benchmarks.pagination --sizes 10000 100000 1000000
+"""
+import argparse
+
+from benchmarks import utils
+
+
+def run(sizes, repeat, page_size):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from app.models import Post
+    from app.pagination import encode_cursor
+    from app.views import post_collection
+
+    factory = APIRequestFactory()
+    authors = utils.seed_users(50)
+    user = User.objects.first()
+
+    def keyset_page(cursor):
+        params = {"page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        request = factory.get("/api/post/", params)
+        force_authenticate(request, user=user)
+        return lambda: post_collection(request).render()
+
+    def offset_page(offset):
+        return lambda: list(Post.objects.all()[offset:offset + page_size])
+
+    print(f"{'posts':>9} {'depth':>7} {'keyset p50':>11} "
+          f"{'keyset p99':>11} {'OFFSET query p50':>17}")
+    for size in sorted(sizes):
+        utils.seed_posts(size - Post.objects.count(), authors)
+        for depth in (0.0, 0.5, 1.0):
+            offset = max(0, min(size - page_size, int(size * depth)))
+            cursor = None
+            if offset:
+                date_published, id = Post.objects.values_list(
+                    "date_published", "id")[offset - 1]
+                cursor = encode_cursor(date_published, id)
+            keyset = utils.summarize(
+                utils.measure(keyset_page(cursor), repeat))
+            offset_stats = utils.summarize(
+                utils.measure(offset_page(offset), repeat))
+            print(f"{size:>9} {depth:>7.0%} {keyset['p50']:>9.2f}ms "
+                  f"{keyset['p99']:>9.2f}ms {offset_stats['p50']:>15.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.sizes, args.repeat, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
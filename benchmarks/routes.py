@@ -0,0 +1,288 @@
+"""
+Benchmark of every API route and the token endpoints: seeds users,
+posts, likes and follows, then calls each route through the full
+middleware stack and reports requests per second, latency
+percentiles and queries per request.
+
+Results can be saved as JSON and compared with a previous run,
+e.g. the baseline of another commit:
+
+    python -m benchmarks.routes --output before.json
+    git checkout other-branch
+    python -m benchmarks.routes --compare before.json
+
+--compare exits with status 1 when a route regressed by more
+than --tolerance in p50 latency or in queries per request.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from benchmarks import utils
+
+PASSWORD = "bench-password-1"
+
+# request(index) returns (path, data) of the index-th call,
+# setup(index), when given, runs before it, untimed and uncounted
+Scenario = namedtuple("Scenario", "name method request setup",
+                      defaults=(None,))
+
+
+def scenarios(user, author_ids, post_ids, own_post_ids, today):
+    """
+    One Scenario per route and method of app.urls and social_net.urls.
+    Writing scenarios pick distinct targets per call,
+    so every call does the work of a first request.
+    Queries of the async routes run on the ASYNC_DB_THREADS pool
+    and are not counted, their latency is.
+    """
+    from django.core.cache import cache
+
+    from app.models import Follow
+
+    rng = random.Random(0)
+    window = f"date_from={today.replace(day=1)}&date_to={today}"
+
+    def any_post(index):
+        return rng.choice(post_ids)
+
+    def own_post(index):
+        return own_post_ids[index % len(own_post_ids)]
+
+    def author(index):
+        return author_ids[index % len(author_ids)]
+
+    def clear_cache(index):
+        cache.clear()
+
+    return [
+        Scenario("token", "post", lambda i: (
+            "/api/token/", {"username": user.username,
+                            "password": PASSWORD})),
+        Scenario("token-refresh", "post", lambda i: (
+            "/api/token/refresh/", {"refresh": user.refresh})),
+        Scenario("token-verify", "post", lambda i: (
+            "/api/token/verify/", {"token": user.access})),
+        Scenario("register", "post", lambda i: (
+            "/api/account/register", {
+                "username": f"bench-new-{i}", "email": f"new-{i}@bench.io",
+                "password": PASSWORD, "password2": PASSWORD})),
+        Scenario("post-list", "get", lambda i: (
+            "/api/post/?page_size=20", None)),
+        Scenario("post-create", "post", lambda i: (
+            "/api/post/", {"title": f"Route bench {i}",
+                           "post": "Lorem ipsum. " * 8})),
+        Scenario("post-bulk", "post", lambda i: (
+            "/api/post/bulk", [{"title": f"Route bulk {i}-{n}",
+                                "post": "Lorem ipsum. " * 8}
+                               for n in range(20)])),
+        Scenario("post-bulk-like", "put", lambda i: (
+            "/api/post/bulk/like", post_ids[i * 20 % len(post_ids):][:20])),
+        Scenario("post-export", "get", lambda i: ("/api/post/export", None)),
+        Scenario("post-get", "get", lambda i: (
+            f"/api/post/{any_post(i)}", None)),
+        Scenario("post-by-slug", "get", lambda i: (
+            f"/api/post/slug/bench-post-{any_post(i) - post_ids[0]}", None)),
+        Scenario("post-update", "put", lambda i: (
+            f"/api/post/{own_post(i)}", {"title": f"Updated {i}",
+                                         "post": "Updated text",
+                                         "author": user.id})),
+        Scenario("post-like", "put", lambda i: (
+            f"/api/post/{any_post(i)}/like", None)),
+        Scenario("user-follow", "put", lambda i: (
+            f"/api/user/{author(i)}/follow", None)),
+        Scenario("user-unfollow", "delete", lambda i: (
+            f"/api/user/{author(i)}/follow", None),
+            lambda i: Follow.follow(user.id, author(i))),
+        Scenario("timeline", "get", lambda i: (
+            "/api/timeline/?page_size=20", None)),
+        Scenario("search", "get", lambda i: (
+            "/api/search/?q=lorem+bench", None)),
+        Scenario("analytics", "get", lambda i: (
+            f"/api/analytics/?{window}", None)),
+        Scenario("analytics-top", "get", lambda i: (
+            f"/api/analytics/?{window}&granularity=month&top=10", None)),
+        # The above are served from the cache after the warm up
+        Scenario("analytics-miss", "get", lambda i: (
+            f"/api/analytics/?{window}", None), clear_cache),
+        Scenario("analytics-top-miss", "get", lambda i: (
+            f"/api/analytics/?{window}&granularity=month&top=10", None),
+            clear_cache),
+        Scenario("user-activity", "get", lambda i: (
+            "/api/user-activity/", None)),
+        Scenario("metrics", "get", lambda i: ("/api/metrics/", None)),
+        Scenario("async-post-list", "get", lambda i: (
+            "/api/async/post/?page_size=20", None)),
+        Scenario("async-post-get", "get", lambda i: (
+            f"/api/async/post/{any_post(i)}", None)),
+        Scenario("async-analytics", "get", lambda i: (
+            f"/api/async/analytics/?{window}", None)),
+        Scenario("async-user-activity", "get", lambda i: (
+            "/api/async/user-activity/", None)),
+        Scenario("post-delete", "delete", lambda i: (
+            f"/api/post/{own_post(i)}", None)),
+    ]
+
+
+def call(client, scenario, index):
+    """
+    Sends the index-th request of scenario, returns
+    its latency in milliseconds and its number of queries.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    path, data = scenario.request(index)
+    kwargs = {}
+    if data is not None:
+        kwargs = {"data": json.dumps(data),
+                  "content_type": "application/json"}
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = getattr(client, scenario.method)(path, **kwargs)
+        if response.streaming:
+            # The body is only queried and rendered while read
+            b"".join(response.streaming_content)
+        latency = (time.perf_counter() - started) * 1000
+    assert response.status_code < 400, (
+        scenario.name, response.status_code, response.content[:200])
+    return latency, len(queries)
+
+
+def run(users, posts, likes, follows, requests, only):
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.utils import timezone as django_timezone
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from app import search
+    from app.models import Follow, Post
+
+    others = utils.seed_users(users)
+    utils.seed_posts(posts, others)
+    post_ids = list(Post.objects.order_by("id").values_list("id", flat=True))
+    utils.seed_likes(others, post_ids, likes)
+    user = User.objects.create_user("bench-client", password=PASSWORD)
+    for other in others[:follows]:
+        Follow.follow(user.id, other.id)
+    search.get_backend().rebuild()
+    # Posts to update and finally delete, one per call
+    utils.seed_posts(requests + 1, [user])
+    own_post_ids = list(Post.objects.filter(author=user).order_by(
+        "id").values_list("id", flat=True))
+
+    refresh = RefreshToken.for_user(user)
+    user.refresh, user.access = str(refresh), str(refresh.access_token)
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {user.access}")
+    results = {}
+    for scenario in scenarios(user, [u.id for u in others], post_ids,
+                              own_post_ids, django_timezone.localdate()):
+        if only and scenario.name not in only:
+            continue
+        # Warm up caches and connections
+        if scenario.setup is not None:
+            scenario.setup(requests)
+        call(client, scenario, requests)
+        samples, queries = [], []
+        setup_seconds = 0
+        started = time.perf_counter()
+        for index in range(requests):
+            if scenario.setup is not None:
+                setup_started = time.perf_counter()
+                scenario.setup(index)
+                setup_seconds += time.perf_counter() - setup_started
+            latency, count = call(client, scenario, index)
+            samples.append(latency)
+            queries.append(count)
+        seconds = time.perf_counter() - started - setup_seconds
+        results[scenario.name] = {
+            "requests": requests,
+            "throughput": requests / seconds,
+            **utils.summarize(samples),
+            "queries": sum(queries) / len(queries),
+            "max_queries": max(queries),
+        }
+    return results
+
+
+def report(results, baseline=None, tolerance=0.0):
+    """
+    Prints results, with the change against baseline when given.
+    Returns the names of the routes that regressed.
+    """
+    regressed = []
+    print(f"{'route':>20} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} "
+          f"{'queries':>8}" + ("  vs baseline" if baseline else ""))
+    for name, row in results.items():
+        line = (f"{name:>20} {row['throughput']:>8.0f} "
+                f"{row['p50']:>7.2f}ms {row['p95']:>7.2f}ms "
+                f"{row['p99']:>7.2f}ms {row['queries']:>8.1f}")
+        before = (baseline or {}).get(name)
+        if before:
+            latency = row["p50"] / before["p50"] - 1
+            queries = row["queries"] - before["queries"]
+            line += f"  p50 {latency:+.0%} queries {queries:+.1f}"
+            if latency > tolerance or queries > 0:
+                regressed.append(name)
+                line += "  REGRESSED"
+        print(line)
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--likes", type=int, default=50,
+                        help="Likes per seeded user")
+    parser.add_argument("--follows", type=int, default=20,
+                        help="Seeded users the client follows")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per route")
+    parser.add_argument("--only", nargs="+", help="Route names to run")
+    parser.add_argument("--output", help="Save results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed p50 slowdown against --compare")
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        results = run(args.users, args.posts, args.likes, args.follows,
+                      args.requests, args.only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["routes"]
+    regressed = report(results, baseline, args.tolerance)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "commit": git_commit(),
+                "date": datetime.now(timezone.utc).isoformat(),
+                "params": {name: getattr(args, name) for name in (
+                    "users", "posts", "likes", "follows", "requests")},
+                "routes": results,
+            }, file, indent=2)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
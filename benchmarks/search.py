@@ -0,0 +1,86 @@
+"""
+Latency of search/ queries at growing table sizes:
+the SQLite FTS5 index against the icontains scan fallback.
+
+    python -m benchmarks.search --sizes 10000 100000
+"""
+import argparse
+import random
+
+from benchmarks import utils
+
+# Words of the generated posts, common and rare ones
+VOCABULARY = [f"w{i:04d}" for i in range(5000)]
+QUERIES = ["w0001", "w0001 w0002", "w0100", "w4999"]
+
+
+def seed_texts(count, authors, batch_size=5000):
+    """
+    Bulk creates posts of random VOCABULARY words, Zipf-like
+    so the first words are common, then rebuilds the index
+    since bulk_create skips the signals.
+    """
+    from app.models import Post
+    from app.search import get_backend
+
+    rng = random.Random(count)
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+    def words(k):
+        return " ".join(rng.choices(VOCABULARY, weights, k=k))
+
+    start = Post.objects.count()
+    for offset in range(0, count, batch_size):
+        Post.objects.bulk_create(
+            Post(author=authors[i % len(authors)], title=words(5),
+                 post=words(60), slug=f"bench-post-{start + i}")
+            for i in range(offset, min(offset + batch_size, count))
+        )
+    get_backend().rebuild()
+
+
+def run(sizes, repeat):
+    from django.contrib.auth.models import User
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from app.models import Post
+    from app.views import post_search
+
+    factory = APIRequestFactory()
+    authors = utils.seed_users(50)
+    user = User.objects.first()
+
+    def search(query):
+        request = factory.get("/api/search/", {"q": query})
+        force_authenticate(request, user=user)
+        return lambda: post_search(request).render()
+
+    print(f"{'posts':>9} {'query':>12} {'fts5 p50':>10} {'fts5 p99':>10} "
+          f"{'scan p50':>10}")
+    for size in sorted(sizes):
+        seed_texts(size - Post.objects.count(), authors)
+        for query in QUERIES:
+            fts = utils.summarize(utils.measure(search(query), repeat))
+            with override_settings(
+                    SEARCH_BACKEND="app.search.DatabaseSearchBackend"):
+                scan = utils.summarize(
+                    utils.measure(search(query), max(1, repeat // 10)))
+            print(f"{size:>9} {query:>12} {fts['p50']:>8.2f}ms "
+                  f"{fts['p99']:>8.2f}ms {scan['p50']:>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
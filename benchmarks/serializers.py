@@ -0,0 +1,63 @@
+"""
+Objects per second of PostSerializer / LikeSerializer against
+the values_list based PostValuesSerializer / LikeValuesSerializer,
+fetching, serializing and rendering JSON.
+
+    python -m benchmarks.serializers --rows 10000
+"""
+import argparse
+
+from benchmarks import utils
+
+
+def run(rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from app.models import Like, Post
+    from app.serializers import (
+        LikeSerializer, LikeValuesSerializer, PostSerializer,
+        PostValuesSerializer)
+
+    users = utils.seed_users(rows // 10 or 1)
+    utils.seed_posts(rows, users)
+    post_ids = list(Post.objects.values_list("id", flat=True))
+    Like.objects.bulk_create(
+        Like(user=users[i % len(users)], post_id=post_ids[i], liked=True)
+        for i in range(rows)
+    )
+    renderer = JSONRenderer()
+
+    def model_path(model, serializer):
+        return lambda: renderer.render(
+            serializer(model.objects.all()[:rows], many=True).data)
+
+    def values_path(model, serializer):
+        return lambda: renderer.render(serializer(
+            serializer.values(model.objects.all()[:rows]), many=True).data)
+
+    print(f"{'serializer':>22} {'objects/s':>11} {'p50':>10}")
+    for model, serializer, values_serializer in (
+            (Post, PostSerializer, PostValuesSerializer),
+            (Like, LikeSerializer, LikeValuesSerializer)):
+        for name, func in (
+                (serializer.__name__, model_path(model, serializer)),
+                (values_serializer.__name__,
+                 values_path(model, values_serializer))):
+            stats = utils.summarize(utils.measure(func, repeat))
+            print(f"{name:>22} {rows / stats['p50'] * 1000:>11.0f} "
+                  f"{stats['p50']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    utils.setup()
+    with utils.temporary_database():
+        run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import contextlib
+import os
+import statistics
+import time
+
+import django
+
+
+def setup():
+    """
+    Configures Django for a standalone benchmark script,
+    with the same environment tweaks the test runner applies.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_net.settings")
+    # Benchmarks measure the work of a request, not the throttles
+    for variable in ("THROTTLE_WRITE", "THROTTLE_WRITE_IP", "THROTTLE_LIKE"):
+        os.environ.setdefault(variable, "")
+    os.environ.setdefault("LOAD_SHED_WRITE_WAIT", "0")
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment(debug=False)
+
+
+@contextlib.contextmanager
+def temporary_database():
+    """
+    Creates a migrated test database for the duration of the block
+    and destroys it afterwards.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_users(count, prefix="bench"):
+    """
+    Bulk creates users without password hashing,
+    returns them as a list.
+    """
+    from django.contrib.auth.models import User
+
+    start = User.objects.count()
+    User.objects.bulk_create(
+        User(username=f"{prefix}-{start + i}") for i in range(count))
+    return list(User.objects.order_by("-id")[:count])
+
+
+def seed_posts(count, authors, batch_size=5000):
+    """
+    Bulk creates posts round-robin over authors.
+    Slugs are set explicitly since bulk_create skips signals.
+    """
+    from app.models import Post
+
+    start = Post.objects.count()
+    for offset in range(0, count, batch_size):
+        Post.objects.bulk_create(
+            Post(
+                author=authors[i % len(authors)],
+                title=f"Benchmark post {start + i}",
+                post="Lorem ipsum dolor sit amet. " * 8,
+                slug=f"bench-post-{start + i}",
+            )
+            for i in range(offset, min(offset + batch_size, count))
+        )
+
+
+def measure(func, repeat):
+    """
+    Calls func repeat times and returns latencies in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples):
+    """
+    Reduces latency samples to mean and percentiles.
+    """
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
+
+
+def seed_likes(users, post_ids, per_user):
+    """
+    Likes per_user posts for every user through Like.toggle_many(),
+    so like counts, rollups and the event log stay consistent.
+    """
+    from app import tasks
+    from app.models import Like
+
+    for index, user in enumerate(users):
+        start = index * per_user % max(len(post_ids), 1)
+        liked = (post_ids[start:] + post_ids[:start])[:per_user]
+        for offset in range(0, len(liked), 500):
+            Like.toggle_many(user.id, liked[offset:offset + 500])
+    # The rollups are bumped by queued tasks
+    tasks.run_pending()
@@ -5,7 +5,11 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_net.settings')
+    # The test suite has its own settings, see social_net.test_settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                          'social_net.test_settings'
+                          if sys.argv[1:2] == ['test']
+                          else 'social_net.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
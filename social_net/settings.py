@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "auth.User"
 
 MIDDLEWARE = [
+    # First, so its latency covers all the other middleware
+    'app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,8 +56,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.ActivityMiddleware',
+    # Last, so only the view reads from the replica, see app.routers
+    'app.middleware.ReplicaRoutingMiddleware',
 ]
 
+# Clients allowed to scrape /api/metrics/, comma separated.
+# Behind a reverse proxy on the same host every client comes
+# from 127.0.0.1, set METRICS_TOKEN there instead
+INTERNAL_IPS = os.environ.get('INTERNAL_IPS', '127.0.0.1').split(',')
+# When set, /api/metrics/ requires "Authorization: Bearer <token>"
+# from any address and INTERNAL_IPS no longer applies
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'social_net.urls'
 
 TEMPLATES = [
@@ -79,14 +92,114 @@ WSGI_APPLICATION = 'social_net.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
+# Configured from DB_* environment variables, SQLite in BASE_DIR
+# by default (tuned with WAL and pragmas, see app.database).
+# DB_CONN_MAX_AGE keeps connections open between requests (seconds,
+# 0 closes them after every request), DB_HEALTH_CHECKS pings them
+# at the start of each request. Connections are per thread, so the
+# process' threads (and ASYNC_DB_THREADS) bound them like a pool.
+# Set DB_POOLER=transaction behind a transaction pooler such as
+# PgBouncer, which can't keep server-side cursors open.
+# Setting DB_REPLICA_HOST or DB_REPLICA_NAME adds a "replica" database,
+# other DB_REPLICA_* values default to the primary's. The reads of
+# GET views go there, see app.routers. The tests stand in a second
+# connection to the test database, see social_net.test_settings.
+
+
+def database_from_env(prefix, defaults):
+    """
+    Builds a DATABASES entry from the prefix* environment variables,
+    falling back to defaults.
+    """
+    def env(name, default=''):
+        return os.environ.get(prefix + name, defaults.get(name, default))
+
+    engine = env('ENGINE', 'django.db.backends.sqlite3')
+    sqlite = engine == 'django.db.backends.sqlite3'
+    return {
+        'ENGINE': engine,
+        'NAME': env('NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+                    if sqlite else 'social_net'),
+        'USER': env('USER'),
+        'PASSWORD': env('PASSWORD'),
+        'HOST': env('HOST'),
+        'PORT': env('PORT'),
+        'CONN_MAX_AGE': int(env('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env('HEALTH_CHECKS', 'true').lower() == 'true',
+        'DISABLE_SERVER_SIDE_CURSORS': env('POOLER') == 'transaction',
+        # Seconds a writer waits for the database lock before failing
+        'OPTIONS': {'timeout': 20} if sqlite else {},
+    }
+
+
+DATABASES = {'default': database_from_env('DB_', {})}
+DATABASES['default']['TEST'] = {
+    # File instead of in-memory database, so connections of
+    # concurrent test threads wait on locks instead of erroring
+    'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+}
+
+_primary = {name: os.environ[f'DB_{name}'] for name in (
+    'ENGINE', 'NAME', 'USER', 'PASSWORD', 'HOST', 'PORT', 'CONN_MAX_AGE',
+    'HEALTH_CHECKS', 'POOLER') if f'DB_{name}' in os.environ}
+if 'DB_REPLICA_HOST' in os.environ or 'DB_REPLICA_NAME' in os.environ:
+    DATABASES['replica'] = database_from_env('DB_REPLICA_', _primary)
 
-DATABASES = {
+DATABASE_ROUTERS = ['app.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# locmem by default, point CACHE_BACKEND / CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.memcached.PyLibMCCache)
+# when running several processes.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Seconds between bulk writes of buffered user activity, see app.activity
+ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 30))
+
+# Threads running the database work of the async views,
+# see app.asyncdb. Each one keeps its own connection
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+
+# Dotted path of the full-text search backend, see app.search.
+# Empty picks SQLite FTS5 on SQLite and a plain scan elsewhere
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', '')
+
+# Authors with more followers are merged into timelines on read
+# instead of being fanned out on write, see app.timeline
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 1000))
+
+# Seconds a serialized post stays in the read-through cache
+POST_CACHE_TIMEOUT = int(os.environ.get('POST_CACHE_TIMEOUT', 300))
+
+# Seconds an analytics result stays cached, likes in its window
+# invalidate it sooner
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', 600))
+
+# Days of full LikeEvent history kept by compact_like_events
+LIKE_EVENT_RETENTION_DAYS = int(
+    os.environ.get('LIKE_EVENT_RETENTION_DAYS', 90))
+
+# Background tasks, see app.tasks. Eager runs them in the request
+# instead of queueing them for `python manage.py run_tasks`
+TASKS_EAGER = os.environ.get('TASKS_EAGER', 'false').lower() == 'true'
+# Attempts of a failing job, retried after TASK_RETRY_DELAY seconds,
+# doubling after every failure
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 5))
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', 10))
+# Seconds a job stays claimed by its worker, it is run again after
+TASK_TIMEOUT = int(os.environ.get('TASK_TIMEOUT', 300))
+# Seconds an idle worker waits before looking for jobs again
+TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -111,15 +224,44 @@ REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
 
+    # Stateless: request.user is built from the token claims,
+    # see app.authentication.LazyTokenUser
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework_simplejwt.authentication.JWTTokenUserAuthentication',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
     ],
+
+    # JSON rendering time is reported by app.middleware.MetricsMiddleware
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    # Token buckets of app.throttling, "capacity/period", an empty
+    # variable disables the scope. Off in social_net.test_settings.
+    'DEFAULT_THROTTLE_RATES': {
+        scope: os.environ.get(variable, default) or None
+        for scope, variable, default in (
+            ('write', 'THROTTLE_WRITE', '60/min'),
+            ('write_ip', 'THROTTLE_WRITE_IP', '300/min'),
+            ('like', 'THROTTLE_LIKE', '120/min'),
+        )
+    },
+    # Proxies in front of the app, for the client IP of write_ip
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)) or None,
 }
 
+# "local" keeps throttle buckets per process, "cache" shares them
+# through CACHES, which must then be a shared backend
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'local')
+
+# Seconds of moving average write statement time over which writes
+# are shed with 503, 0 disables it, see app.throttling
+LOAD_SHED_WRITE_WAIT = float(os.environ.get('LOAD_SHED_WRITE_WAIT', 0.25))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -146,6 +288,8 @@ SIMPLE_JWT = {
 
     'JTI_CLAIM': 'jti',
 
+    'TOKEN_USER_CLASS': 'app.authentication.LazyTokenUser',
+
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
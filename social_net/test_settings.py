@@ -0,0 +1,24 @@
+"""
+Settings of the test suite: social_net.settings with throttles off,
+background tasks run inline and a stand-in replica.
+
+`python manage.py test` picks them by default (see manage.py),
+elsewhere pass --settings=social_net.test_settings.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REST_FRAMEWORK
+
+# No throttling, see test_throttling for the buckets
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+
+# Tasks run inside the writes that queue them, see test_tasks
+# for the queue
+TASKS_EAGER = os.environ.get('TASKS_EAGER', 'true').lower() == 'true'
+
+# Unless DB_REPLICA_* configures one, the replica is a second
+# connection to the test database
+DATABASES = dict(DATABASES)
+DATABASES.setdefault('replica', dict(DATABASES['default'],
+                                     TEST={'MIRROR': 'default'}))